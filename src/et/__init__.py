@@ -0,0 +1,83 @@
+"""
+Eric's Tools.
+
+The public entry points are importable from the top-level package (e.g. `from et import mkdir, timeit`), but their
+submodules are only imported on first use (PEP 562), so `import et` is instant and a script only pays for the heavy
+dependencies (matplotlib, wandb, gymnasium, ...) of the tools it actually uses.
+"""
+import importlib
+
+# Public name -> submodule defining it
+_LAZY_ATTRS = {
+    # et.decorators
+    'timeit': 'et.decorators.timeit',
+    'TimingStats': 'et.decorators.timeit',
+    'MemoryStats': 'et.decorators.timeit',
+    'span': 'et.decorators.span',
+    'span_report': 'et.decorators.span',
+    'span_report_at_exit': 'et.decorators.span',
+    'get_span_stats': 'et.decorators.span',
+    'reset_spans': 'et.decorators.span',
+    'disk_cache': 'et.decorators.disk_cache',
+    # et.os
+    'cp_r': 'et.os.cp',
+    'symlink': 'et.os.cp',
+    'mkdir': 'et.os.mkdir',
+    # et.utils
+    'compress_obj': 'et.utils.compress',
+    'decompress_obj': 'et.utils.compress',
+    'dump_compressed': 'et.utils.compress',
+    'load_compressed': 'et.utils.compress',
+    'load_yaml': 'et.utils.dotwiz',
+    'load_yaml_many': 'et.utils.dotwiz',
+    'convert_to_dotwiz': 'et.utils.dotwiz',
+    'flatten_list': 'et.utils.lists',
+    'iter_flatten': 'et.utils.lists',
+    'iter_unique': 'et.utils.lists',
+    'remove_duplicates': 'et.utils.lists',
+    'find_nested_index': 'et.utils.lists',
+    'NestedIndex': 'et.utils.lists',
+    'MetricsLogger': 'et.utils.metrics',
+    'JsonlSink': 'et.utils.metrics',
+    'WandbSink': 'et.utils.metrics',
+    'TensorBoardSink': 'et.utils.metrics',
+    'set_seed': 'et.utils.seed',
+    'set_env_seed': 'et.utils.seed',
+    'seed_vector_env': 'et.utils.seed',
+    'spawn_generators': 'et.utils.seed',
+    'get_rng_state': 'et.utils.seed',
+    'set_rng_state': 'et.utils.seed',
+    'set_logger_format': 'et.utils.setup',
+    'setup_eric_env': 'et.utils.setup',
+    'pprint_table': 'et.utils.vis',
+    'Table': 'et.utils.vis',
+    'pprint_tree': 'et.utils.vis',
+    'recommend_fps': 'et.utils.vis',
+    'make_animation': 'et.utils.vis',
+    'make_gif': 'et.utils.vis',
+    'VideoWriter': 'et.utils.vis',
+    'GifWriter': 'et.utils.vis',
+    'render_frames': 'et.utils.vis',
+    'render_animation': 'et.utils.vis',
+    'extract_frame': 'et.utils.vis',
+    'setup_wandb_run': 'et.utils.wandb',
+}
+_SUBPACKAGES = ('decorators', 'os', 'utils')
+
+__all__ = sorted(_LAZY_ATTRS)
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        value = getattr(importlib.import_module(_LAZY_ATTRS[name]), name)
+    elif name in _SUBPACKAGES:
+        value = importlib.import_module(f'{__name__}.{name}')
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # Cache it, so __getattr__ is only called on first use
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS) | set(_SUBPACKAGES))
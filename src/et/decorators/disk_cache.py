@@ -0,0 +1,259 @@
+import _pickle as cPickle
+import functools
+import hashlib
+import inspect
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from loguru import logger
+
+from et.utils.compress import dump_compressed, load_compressed
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'et', 'disk_cache')
+ENTRY_SUFFIX = '.etz'
+_MISS = object()
+
+
+def disk_cache(f=None, *, cache_dir: str = None, max_size: int = None, ttl: float = None, memory_size: int = 128,
+               codec: str = 'zlib'):
+    """
+    Decorator to memoize a function's results on disk, so expensive results (e.g. preprocessing) are reused across
+    runs and processes. Entries are keyed by a hash of the function's qualified name, its source code and its
+    arguments (which must be picklable), and stored compressed with `et.utils.compress`. The arguments are bound to the
+    function's signature first, so `f(1)`, `f(x=1)` and `f(1, y=<default>)` share an entry.
+
+    Concurrent workers computing the same entry are serialized with a file lock, so it is only computed once (on POSIX
+    systems, elsewhere they may both compute it, entries are written atomically either way). Hot entries are also kept
+    in an in-memory LRU in front of the disk (note that this returns the same object to every caller, like
+    `functools.lru_cache`).
+
+    Example usage:
+    ```
+    @disk_cache
+    def preprocess(path):
+        ...
+
+    @disk_cache(max_size=10 << 30, ttl=24 * 3600)
+    def featurize(data, window=10):
+        ...
+
+    featurize.cache_info()
+    ```
+
+    Parameters
+    ----------
+    f : function
+        Function to cache.
+    cache_dir : str
+        Root directory of the cache. Defaults to ~/.cache/et/disk_cache. Each function gets its own subdirectory.
+    max_size : int
+        Maximum size in bytes of this function's entries on disk. Least recently used entries are evicted past it.
+    ttl : float
+        Time to live of an entry in seconds. Older entries are recomputed.
+    memory_size : int
+        Maximum number of entries in the in-memory LRU. 0 disables it.
+    codec : str
+        Compression codec, see `et.utils.compress.compress_obj`.
+
+    Returns
+    -------
+    cached : function
+        Decorated, with `cache_info()` returning the hit/miss statistics and `cache_clear()` clearing the cache.
+    """
+    if f is None:
+        return functools.partial(disk_cache, cache_dir=cache_dir, max_size=max_size, ttl=ttl, memory_size=memory_size,
+                                 codec=codec)
+
+    name = f"{f.__module__}.{f.__qualname__}"
+    root = os.path.join(cache_dir or DEFAULT_CACHE_DIR, name)
+    prefix = hashlib.blake2b(name.encode() + _get_source(f).encode(), digest_size=16).digest()
+    try:
+        signature = inspect.signature(f)
+    except (TypeError, ValueError):  # Some builtins have no signature
+        signature = None
+    memory = OrderedDict()
+    stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0}
+    lock = threading.Lock()
+
+    def remember(key, value):
+        if memory_size <= 0:
+            return
+        with lock:
+            memory[key] = value
+            memory.move_to_end(key)
+            while len(memory) > memory_size:
+                memory.popitem(last=False)
+
+    @functools.wraps(f)
+    def cached(*args, **kwargs):
+        key = _make_key(prefix, *_bind(signature, args, kwargs))
+        with lock:
+            if key in memory:
+                memory.move_to_end(key)
+                stats['memory_hits'] += 1
+                return memory[key]
+
+        path = os.path.join(root, key[:2], key + ENTRY_SUFFIX)
+        value, stat = _load_entry(path, ttl), 'disk_hits'
+        if value is _MISS:
+            lock_dir = os.path.join(root, 'locks')
+            os.makedirs(lock_dir, exist_ok=True)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with _file_lock(os.path.join(lock_dir, key + '.lock')):
+                # Another worker may have computed it while we were waiting for the lock
+                value = _load_entry(path, ttl)
+                if value is _MISS:
+                    value, stat = f(*args, **kwargs), 'misses'
+                    dump_compressed(value, path, codec=codec, atomic=True)
+                    if max_size is not None:
+                        _evict(root, max_size)
+        with lock:
+            stats[stat] += 1
+        remember(key, value)
+        return value
+
+    def cache_info() -> dict:
+        with lock:
+            info = dict(stats, memory_entries=len(memory))
+        calls = info['memory_hits'] + info['disk_hits'] + info['misses']
+        info['hit_rate'] = (info['memory_hits'] + info['disk_hits']) / calls if calls else 0.
+        return info
+
+    def cache_clear(memory_only: bool = False):
+        with lock:
+            memory.clear()
+            stats.update(memory_hits=0, disk_hits=0, misses=0)
+        if not memory_only:
+            shutil.rmtree(root, ignore_errors=True)
+
+    cached.cache_info = cache_info
+    cached.cache_clear = cache_clear
+    cached.cache_dir = root
+    return cached
+
+
+def _get_source(f) -> str:
+    """
+    Get the source of a function so that editing it invalidates its cache. Falls back to its bytecode and constants
+    when the source isn't available (e.g. defined in a REPL).
+    """
+    try:
+        return inspect.getsource(f)
+    except (OSError, TypeError):
+        code = getattr(f, '__code__', None)
+        return repr((code.co_code, code.co_consts)) if code is not None else ''
+
+
+def _bind(signature: inspect.Signature | None, args: tuple, kwargs: dict) -> tuple:
+    """
+    Normalize the arguments of a call by binding them to the function's signature and applying the defaults. Returns
+    them as is if they don't match the signature, so that calling the function raises the usual TypeError.
+    """
+    if signature is None:
+        return args, kwargs
+    try:
+        bound = signature.bind(*args, **kwargs)
+    except TypeError:
+        return args, kwargs
+    bound.apply_defaults()
+    return bound.args, bound.kwargs
+
+
+@contextmanager
+def _file_lock(path: str):
+    """
+    Hold an exclusive lock on a lock file, which is removed on release so the locks directory doesn't grow with every
+    entry ever computed. Since a waiter may have opened the file before it was removed, the lock only counts once the
+    locked file is still the one at path, else it's retried on the new file. Without fcntl (Windows), nothing is locked.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    while True:
+        lock_file = open(path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                same = os.stat(path).st_ino == os.fstat(lock_file.fileno()).st_ino
+            except FileNotFoundError:
+                same = False
+            if same:
+                try:
+                    yield
+                finally:
+                    # Remove it while still holding the lock, so nobody can lock the removed file after us
+                    _remove(path)
+                return
+        finally:
+            lock_file.close()
+
+
+def _make_key(prefix: bytes, args: tuple, kwargs: dict) -> str:
+    """
+    Hash the function and its arguments into the content address of the entry.
+    """
+    h = hashlib.blake2b(prefix, digest_size=20)
+    h.update(cPickle.dumps((args, sorted(kwargs.items())), protocol=5))
+    return h.hexdigest()
+
+
+def _load_entry(path: str, ttl: float = None):
+    """
+    Load a cache entry, or return _MISS if it doesn't exist, has expired or is corrupt. The entry's creation time is
+    its mtime and its last access time (for LRU eviction) its atime.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return _MISS
+    now = time.time()
+    if ttl is not None and now - st.st_mtime > ttl:
+        _remove(path)
+        return _MISS
+    try:
+        value = load_compressed(path)
+    except FileNotFoundError:  # Evicted by another worker in the meantime
+        return _MISS
+    except Exception as e:
+        logger.warning(f"Removing corrupt cache entry {path}: {e}")
+        _remove(path)
+        return _MISS
+    try:
+        os.utime(path, (now, st.st_mtime))
+    except OSError:
+        pass
+    return value
+
+
+def _evict(root: str, max_size: int):
+    """
+    Remove the least recently used entries until the total size of the entries under root fits in max_size.
+    """
+    entries, total = [], 0
+    for shard in os.scandir(root):
+        if not shard.is_dir() or shard.name == 'locks':
+            continue
+        for entry in os.scandir(shard.path):
+            if entry.name.endswith(ENTRY_SUFFIX):
+                st = entry.stat()
+                entries.append((st.st_atime, st.st_size, entry.path))
+                total += st.st_size
+    for _, size, path in sorted(entries):
+        if total <= max_size:
+            break
+        _remove(path)
+        total -= size
+
+
+def _remove(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
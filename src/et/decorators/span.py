@@ -0,0 +1,274 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from typing import Dict, Tuple
+
+# Process-wide timings keyed by span path, e.g. ('train', 'rollout', 'env.step'). Each value is
+# [count, total_ns, self_ns, max_ns].
+_stats: Dict[Tuple[str, ...], list] = {}
+_lock = threading.Lock()
+# Innermost open span of the current context, as a frame [path, start_ns, child_ns, parent frame]. A context variable
+# rather than a thread-local, so that concurrent asyncio tasks each get their own stack of spans.
+_current = contextvars.ContextVar('et_span', default=None)
+_atexit_registered = False
+
+
+class span:
+    """
+    Low-overhead hierarchical timing span. Spans opened inside other spans (in the same thread or asyncio task) are
+    nested under them, so the timings form a call tree keyed by the path of span names. For each path we keep the
+    number of calls, total time, self time (total minus the time spent in child spans) and the max time of one call,
+    aggregated over the whole process. Print it with `span_report`. Much cheaper than running the whole program under
+    cProfile.
+
+    Example usage:
+    ```
+    @span
+    def train_step(batch):
+        with span('forward'):
+            ...
+        with span('backward'):
+            ...
+
+    for batch in loader:
+        with span('data'):
+            ...
+        train_step(batch)
+    span_report()
+    ```
+
+    A generator shares the context of whoever resumes it, so don't keep a `with span(...)` open across a `yield`: the
+    caller's spans would be nested under it until the generator resumes. Decorate the generator function instead, each
+    resume is then timed as one call of the span, nested under the spans open where it is resumed. Decorated `async def`
+    functions are timed from the start to the end of the awaited call (including the time spent waiting). Children run
+    concurrently (e.g. with `asyncio.gather`) overlap, so the self time of their parent can be negative.
+
+    Parameters
+    ----------
+    name : str | callable
+        Name of the span. When used as a bare decorator (`@span`), this is the decorated function and the span is named
+        after its qualified name.
+    """
+
+    __slots__ = ('name',)
+
+    def __new__(cls, name):
+        # `@span` on a function: return the wrapped function directly, so methods etc. behave as usual
+        if callable(name):
+            return cls._wrap(name)
+        return super().__new__(cls)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        _enter(self.name)
+        return self
+
+    def __exit__(self, *exc):
+        _exit()
+        return False
+
+    def __call__(self, f):
+        # `@span('name')` on a function
+        return self._wrap(f, self.name)
+
+    @staticmethod
+    def _wrap(f, name=None):
+        name = name or f.__qualname__
+        if inspect.isgeneratorfunction(f):
+            return _wrap_generator(f, name)
+        if inspect.iscoroutinefunction(f):
+            return _wrap_coroutine(f, name)
+
+        @functools.wraps(f)
+        def wrapped(*args, **kwargs):
+            _enter(name)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                _exit()
+
+        return wrapped
+
+
+def _wrap_generator(f, name: str):
+    """
+    Wrap a generator function so that only the time spent inside the generator is timed, one call per resume, instead
+    of leaving the span open while the generator is suspended.
+    """
+
+    @functools.wraps(f)
+    def wrapped(*args, **kwargs):
+        gen = f(*args, **kwargs)
+        resume, arg = gen.send, None
+        while True:
+            _enter(name)
+            try:
+                value = resume(arg)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                _exit()
+            try:
+                arg, resume = (yield value), gen.send
+            except GeneratorExit:
+                gen.close()
+                raise
+            except BaseException as exc:
+                arg, resume = exc, gen.throw
+
+    return wrapped
+
+
+def _wrap_coroutine(f, name: str):
+    """
+    Wrap a coroutine function so that the span covers the awaited call, not just the creation of the coroutine.
+    """
+
+    @functools.wraps(f)
+    async def wrapped(*args, **kwargs):
+        _enter(name)
+        try:
+            return await f(*args, **kwargs)
+        finally:
+            _exit()
+
+    return wrapped
+
+
+def _enter(name: str):
+    parent = _current.get()
+    path = parent[0] + (name,) if parent is not None else (name,)
+    _current.set([path, time.perf_counter_ns(), 0, parent])
+
+
+def _exit():
+    end = time.perf_counter_ns()
+    path, start, child, parent = _current.get()
+    _current.set(parent)
+    elapsed = end - start
+    if parent is not None:
+        parent[2] += elapsed
+    with _lock:
+        stats = _stats.get(path)
+        if stats is None:
+            _stats[path] = [1, elapsed, elapsed - child, elapsed]
+        else:
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed - child
+            if elapsed > stats[3]:
+                stats[3] = elapsed
+
+
+def get_span_stats() -> Dict[str, Dict[str, float]]:
+    """
+    Get a snapshot of the aggregated span timings.
+
+    Returns
+    -------
+    dict
+        Maps each span path (names joined with '/') to its count, total, self, mean and max time in seconds.
+    """
+    with _lock:
+        snapshot = {path: list(stats) for path, stats in _stats.items()}
+    return {
+        '/'.join(path): {
+            'count': count,
+            'total': total / 1e9,
+            'self': self_ns / 1e9,
+            'mean': total / count / 1e9,
+            'max': max_ns / 1e9,
+        }
+        for path, (count, total, self_ns, max_ns) in sorted(snapshot.items())
+    }
+
+
+def reset_spans():
+    """
+    Clear all aggregated span timings.
+    """
+    with _lock:
+        _stats.clear()
+
+
+def span_report(tree: bool = True, table: bool = True, return_str: bool = False) -> str | None:
+    """
+    Print the aggregated span timings as a call tree (with `pprint_tree`) and/or a flat table (with `pprint_table`).
+
+    Parameters
+    ----------
+    tree : bool
+        Whether to print the call tree.
+    table : bool
+        Whether to print the table of per-path timings.
+    return_str : bool
+        Whether to return the call tree as a string instead of printing it. The table is always logged.
+
+    Returns
+    -------
+    str | None
+        The call tree as a string if return_str is True, else None.
+    """
+    from et.utils.vis import pprint_table, pprint_tree
+
+    stats = get_span_stats()
+    if not stats:
+        return '' if return_str else None
+
+    result = None
+    if tree:
+        # Build the call tree from the paths. Root is a dummy node so that multiple top-level spans are supported.
+        root = {'name': 'spans', 'stats': None, 'children': {}}
+        for path, path_stats in stats.items():
+            node = root
+            for name in path.split('/'):
+                node = node['children'].setdefault(name, {'name': name, 'stats': None, 'children': {}})
+            node['stats'] = path_stats
+        grand_total = sum(node['stats']['total'] for node in root['children'].values() if node['stats']) or 1.
+
+        def get_value(node):
+            if node['stats'] is None:
+                return node['name']
+            s = node['stats']
+            return (f"{node['name']} x{s['count']}\n"
+                    f"total {s['total'] * 1e3:.1f}ms ({100 * s['total'] / grand_total:.1f}%)\n"
+                    f"self {s['self'] * 1e3:.1f}ms | max {s['max'] * 1e3:.1f}ms")
+
+        def get_children(node):
+            # Hottest first
+            return sorted(node['children'].values(), key=lambda c: -c['stats']['total'] if c['stats'] else 0)
+
+        result = pprint_tree(root, get_children, get_value, return_str=return_str)
+
+    if table:
+        pprint_table({
+            path: {
+                'count': s['count'],
+                'total (ms)': s['total'] * 1e3,
+                'self (ms)': s['self'] * 1e3,
+                'mean (ms)': s['mean'] * 1e3,
+                'max (ms)': s['max'] * 1e3,
+            }
+            for path, s in stats.items()
+        }, sort_metrics=False)
+    return result
+
+
+def span_report_at_exit(**kwargs):
+    """
+    Print the span report when the process exits. Safe to call multiple times.
+
+    Parameters
+    ----------
+    kwargs : dict
+        Arguments to pass to `span_report`.
+    """
+    global _atexit_registered
+    if not _atexit_registered:
+        atexit.register(span_report, **kwargs)
+        _atexit_registered = True
@@ -1,21 +1,85 @@
+import functools
+import gc
+import math
+import resource
+import sys
 import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import List, Tuple
 
-import numpy as np
 from loguru import logger
 
 from et.utils.pretty_print import color
+from et.utils.setup import log_enabled
 
 
-def timeit(f, trials=1):
+@dataclass
+class MemoryStats:
+    """
+    Structured results of a `timeit` memory profile of one call. Sizes are in bytes.
+
+    `traced_peak` is the high-water mark of Python allocations during the call, so it includes temporaries freed before
+    the call returned. The `retained_*` fields only count the memory still allocated when the call returned (e.g. its
+    result or what it cached): tracemalloc only tracks live memory, so short-lived allocations don't show up there.
+    """
+    rss_peak_delta: int
+    traced_peak: int
+    retained_bytes: int
+    retained_blocks: int
+    # (file:line, bytes retained, blocks retained) of the source lines retaining the most memory
+    top_retained_lines: List[Tuple[str, int, int]] = field(default_factory=list)
+
+
+@dataclass
+class TimingStats:
+    """
+    Structured results of a `timeit` run. All times are in seconds per call (i.e. already divided by `number`).
+    """
+    name: str
+    trials: int
+    number: int
+    times: List[float] = field(repr=False)
+    outliers: int = 0
+    mean: float = 0.
+    std: float = 0.
+    var: float = 0.
+    median: float = 0.
+    min: float = 0.
+    max: float = 0.
+    p50: float = 0.
+    p90: float = 0.
+    p99: float = 0.
+    memory: MemoryStats | None = None
+
+
+def timeit(f, trials=1, warmup: int = 0, number: int | None = 1, min_trial_time: float = 0.05,
+           disable_gc: bool = False, reject_outliers: bool = False, memory: bool = False, top_lines: int = 5):
     """
     Decorator to time a function. I stole these code snippets from some random Stack Overflow posts.
 
+    Timing uses `time.perf_counter_ns`, and the function is called on every trial. For trustworthy benchmarks of fast
+    functions, use a few warmup rounds, let the inner loop count auto-calibrate (`number=None`), disable the garbage
+    collector and reject outliers. The stats of the last call are stored as a `TimingStats` on `timed.stats`.
+
+    With `memory=True`, the function is called one extra time under `tracemalloc` (after the timed trials, so tracing
+    doesn't skew the timings) to record the growth of the process's peak RSS, the peak traced Python memory (including
+    temporaries), and the memory still allocated when the call returns along with the source lines that allocated it.
+    These are stored on `timed.stats.memory`, see `MemoryStats`.
+
     Example usage:
     ```
     import functools as ft
     @ft.partial(timeit, trials=10)
     def foo():
         return sum([i for i in range(1000000)])
+
+    @ft.partial(timeit, trials=30, warmup=3, number=None, disable_gc=True, reject_outliers=True)
+    def bar():
+        return sorted(range(1000))
+
+    bar()
+    assert bar.stats.p99 < 1e-3
     ```
 
     Parameters
@@ -24,6 +88,21 @@ def timeit(f, trials=1):
         Function to time.
     trials : int
         Number of trials to run the function.
+    warmup : int
+        Number of untimed calls before the trials (warms up caches, lazy imports, JITs, etc.).
+    number : int | None
+        Number of calls per trial (inner loop count). If None, it is calibrated so that one trial takes at least
+        `min_trial_time` seconds, like the standard library's `timeit.Timer.autorange`.
+    min_trial_time : float
+        Minimum duration of one trial in seconds when calibrating `number`.
+    disable_gc : bool
+        Whether to disable the garbage collector while timing.
+    reject_outliers : bool
+        Whether to drop trials outside of Tukey's fences (1.5 IQR beyond the quartiles) before computing the stats.
+    memory : bool
+        Whether to also profile the memory usage of one call.
+    top_lines : int
+        Number of source lines retaining the most memory to report with `memory=True`.
 
     Returns
     -------
@@ -31,21 +110,173 @@ def timeit(f, trials=1):
         Decorated
     """
 
+    @functools.wraps(f)
     def timed(*args, **kw):
-        result, times = None, []
-        for _ in range(trials):
-            ts = time.time()
-            result = f(*args, **kw) if result is None else result
-            te = time.time()
-            times.append(te - ts)
-        mean, var, median = np.mean(times), np.var(times), np.median(times)
-        logger \
-            .opt(colors=True) \
-            .debug(f"{color.END}func: {color.BOLD + color.GREEN}{f.__name__}{color.END * 2} "
-                   # f"| args: [{args}, {kw}]{'':<10}"  # Comment for now, it is unsafe. 
-                   f"| trials: {color.BOLD}{trials}{color.END} "
-                   f"| mean: {color.BOLD + color.RED}{mean:.3f}s {color.PLUSMINUS} {var:.2f}s{color.END * 2} "
-                   f"| median: {color.BOLD + color.BLUE}{median:.3f}s{color.END * 2}")
+        result = None
+        for _ in range(warmup):
+            result = f(*args, **kw)
+
+        gc_was_enabled = gc.isenabled()
+        if disable_gc:
+            gc.collect()
+            gc.disable()
+        try:
+            n = number if number is not None else _calibrate(f, args, kw, min_trial_time)
+            times = []
+            for _ in range(trials):
+                elapsed, result = _run_trial(f, args, kw, n)
+                times.append(elapsed / n / 1e9)
+        finally:
+            if disable_gc and gc_was_enabled:
+                gc.enable()
+
+        timed.stats = stats = _summarize(f.__name__, times, n, reject_outliers)
+        # Building the colored message is comparatively slow, skip it when DEBUG isn't logged
+        if log_enabled('DEBUG'):
+            logger \
+                .opt(colors=True) \
+                .debug(f"{color.END}func: {color.BOLD + color.GREEN}{f.__name__}{color.END * 2} "
+                       # f"| args: [{args}, {kw}]{'':<10}"  # Comment for now, it is unsafe.
+                       f"| trials: {color.BOLD}{trials}{color.END} "
+                       + (f"| loops: {color.BOLD}{n}{color.END} " if n > 1 else "")
+                       + f"| mean: {color.BOLD + color.RED}{_format_time(stats.mean)} {color.PLUSMINUS} "
+                         f"{_format_time(stats.std)}{color.END * 2} "
+                         f"| median: {color.BOLD + color.BLUE}{_format_time(stats.median)}{color.END * 2}"
+                       + (f" | p90: {color.BOLD}{_format_time(stats.p90)}{color.END} "
+                          f"| p99: {color.BOLD}{_format_time(stats.p99)}{color.END}" if trials > 1 else "")
+                       + (f" | outliers: {color.BOLD}{stats.outliers}{color.END}" if reject_outliers else ""))
+
+        if memory:
+            stats.memory, result = _profile_memory(f, args, kw, top_lines)
+            mem = stats.memory
+            if log_enabled('DEBUG'):
+                top_lines_str = ''.join(f"\n    {color.CYAN}{_escape_tags(location)}{color.END} "
+                                        f"{color.BOLD}{_format_bytes(size)}{color.END} ({count} blocks)"
+                                        for location, size, count in mem.top_retained_lines)
+                logger \
+                    .opt(colors=True) \
+                    .debug(f"{color.END}func: {color.BOLD + color.GREEN}{f.__name__}{color.END * 2} "
+                           f"| traced peak: {color.BOLD + color.RED}{_format_bytes(mem.traced_peak)}{color.END * 2} "
+                           f"| rss peak delta: {color.BOLD + color.BLUE}{_format_bytes(mem.rss_peak_delta)}{color.END * 2} "
+                           f"| retained: {color.BOLD}{_format_bytes(mem.retained_bytes)}{color.END} "
+                           f"in {color.BOLD}{mem.retained_blocks}{color.END} blocks{top_lines_str}")
         return result
 
+    timed.stats = None
     return timed
+
+
+def _run_trial(f, args, kw, number):
+    """
+    Call f `number` times and return the elapsed time in nanoseconds along with the last result.
+    """
+    result = None
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        result = f(*args, **kw)
+    return time.perf_counter_ns() - start, result
+
+
+def _calibrate(f, args, kw, min_trial_time: float) -> int:
+    """
+    Find the smallest loop count in 1, 2, 5, 10, 20, 50, ... such that one trial takes at least `min_trial_time`.
+    """
+    number = 1
+    while True:
+        for multiplier in (1, 2, 5):
+            elapsed, _ = _run_trial(f, args, kw, number * multiplier)
+            if elapsed >= min_trial_time * 1e9:
+                return number * multiplier
+        number *= 10
+
+
+def _summarize(name: str, times: List[float], number: int, reject_outliers: bool) -> TimingStats:
+    """
+    Compute the statistics over the per-call times of each trial. Pure Python (no NumPy), so that importing `timeit`
+    stays cheap.
+    """
+    kept = sorted(times)
+    if reject_outliers and len(kept) >= 4:
+        q1, q3 = _percentile(kept, 25), _percentile(kept, 75)
+        iqr = q3 - q1
+        kept = [t for t in kept if q1 - 1.5 * iqr <= t <= q3 + 1.5 * iqr]
+    mean = sum(kept) / len(kept)
+    var = sum((t - mean) ** 2 for t in kept) / len(kept)
+    p50, p90, p99 = _percentile(kept, 50), _percentile(kept, 90), _percentile(kept, 99)
+    return TimingStats(name=name, trials=len(times), number=number, times=list(times),
+                       outliers=len(times) - len(kept), mean=mean, std=math.sqrt(var), var=var, median=p50,
+                       min=kept[0], max=kept[-1], p50=p50, p90=p90, p99=p99)
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    """
+    q-th percentile of sorted values, linearly interpolated between the closest ranks like `np.percentile`'s default.
+    """
+    rank = (len(sorted_values) - 1) * q / 100
+    lo = math.floor(rank)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (rank - lo)
+
+
+def _profile_memory(f, args, kw, top_lines: int) -> Tuple[MemoryStats, object]:
+    """
+    Call f once under tracemalloc and return its memory stats along with the result.
+    """
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+        base, _ = tracemalloc.get_traced_memory()
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        result = f(*args, **kw)
+        rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        _, peak = tracemalloc.get_traced_memory()
+        after = tracemalloc.take_snapshot()
+    finally:
+        if not was_tracing:
+            tracemalloc.stop()
+
+    # Ignore tracemalloc's and our own allocations (the snapshots)
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+    diffs = [d for d in after.filter_traces(filters).compare_to(before.filter_traces(filters), 'lineno')
+             if d.size_diff > 0]
+    diffs.sort(key=lambda d: d.size_diff, reverse=True)
+    # ru_maxrss is in kilobytes on Linux, bytes on macOS
+    rss_scale = 1 if sys.platform == 'darwin' else 1024
+    return MemoryStats(
+        rss_peak_delta=(rss_after - rss_before) * rss_scale,
+        traced_peak=peak - base,
+        retained_bytes=sum(d.size_diff for d in diffs),
+        retained_blocks=sum(d.count_diff for d in diffs if d.count_diff > 0),
+        top_retained_lines=[(f"{d.traceback[0].filename}:{d.traceback[0].lineno}", d.size_diff, d.count_diff)
+                            for d in diffs[:top_lines]],
+    ), result
+
+
+def _escape_tags(s: str) -> str:
+    """
+    Escape '<' so loguru doesn't parse e.g. '<string>' as a color tag.
+    """
+    return s.replace('<', r'\<')
+
+
+def _format_bytes(n: int) -> str:
+    """
+    Format a number of bytes with a unit suited to its magnitude.
+    """
+    for unit, scale in (('GB', 1 << 30), ('MB', 1 << 20), ('KB', 1 << 10)):
+        if abs(n) >= scale:
+            return f"{n / scale:.2f}{unit}"
+    return f"{n}B"
+
+
+def _format_time(seconds: float) -> str:
+    """
+    Format a duration with a unit suited to its magnitude.
+    """
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.3f}{unit}"
+    return f"{seconds / 1e-9:.1f}ns"
@@ -1,17 +1,35 @@
 import os
 import shutil
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 
-def mkdir(paths: str | list, hard: bool = False):
+def mkdir(paths: str | list, hard: bool = False, batched: bool = False, max_workers: int = None):
     """
     Create a directory at the given path.
 
+    With `batched=True`, the paths are first deduplicated (and any path that is a parent of another requested path is
+    dropped, since creating the child creates it too), then created through a thread pool. `hard` deletes are done by
+    renaming the old directory out of the way and removing it in a background thread, so the fresh directories are
+    available right away. This is much faster for thousands of paths, especially on network filesystems.
+
     Parameters
     ----------
     paths : str or list
         The path(s) of the directory to create.
     hard : bool, optional
         If True, delete the directory if it already exists.
+    batched : bool, optional
+        If True, use the batched, multithreaded mode described above.
+    max_workers : int, optional
+        Number of threads to create directories with when `batched=True`. Defaults to the `ThreadPoolExecutor` default.
+
+    Returns
+    -------
+    threading.Thread | None
+        With `batched=True` and `hard=True`, the background thread deleting the old directories (join it to wait for
+        the deletion to finish), or None if there was nothing to delete.
     """
     assert isinstance(paths, (str, list)), "paths must be a string or a list of strings."
     assert isinstance(hard, bool), "hard must be a boolean."
@@ -19,8 +37,63 @@ def mkdir(paths: str | list, hard: bool = False):
     if isinstance(paths, str):
         paths = [paths]
 
+    if batched:
+        return _mkdir_batched(paths, hard=hard, max_workers=max_workers)
+
     for path in paths:
         if hard:
             # Create a directory
             shutil.rmtree(path, ignore_errors=True)
         os.makedirs(path, exist_ok=True)
+
+
+def _mkdir_batched(paths: list, hard: bool = False, max_workers: int = None) -> threading.Thread | None:
+    """
+    Batched, multithreaded version of `mkdir`.
+    """
+    # Sorting by components puts every path right before its descendants ('a/b' < 'a/b/c' < 'a/b-c')
+    paths = sorted({os.path.normpath(os.path.abspath(path)) for path in paths}, key=lambda p: p.split(os.sep))
+
+    trash_thread = None
+    if hard:
+        # Only the top-most paths need deleting, that takes their requested descendants with them
+        tops = []
+        for path in paths:
+            if not tops or not _is_ancestor(tops[-1], path):
+                tops.append(path)
+        trash = [trashed for trashed in map(_move_to_trash, tops) if trashed is not None]
+        if trash:
+            # Not a daemon, so the interpreter waits for the deletion to finish on exit instead of leaving trash behind
+            trash_thread = threading.Thread(target=lambda: [shutil.rmtree(t, ignore_errors=True) for t in trash],
+                                            name='et-mkdir-trash')
+            trash_thread.start()
+
+    # Only the leaves need creating, `os.makedirs` creates their parents
+    leaves = [path for path, following in zip(paths, paths[1:] + [None])
+              if following is None or not _is_ancestor(path, following)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda path: os.makedirs(path, exist_ok=True), leaves))
+
+    return trash_thread
+
+
+def _is_ancestor(parent: str, child: str) -> bool:
+    return child.startswith(parent.rstrip(os.sep) + os.sep)
+
+
+def _move_to_trash(path: str) -> str | None:
+    """
+    Rename path to a hidden sibling so it can be deleted later. Renaming within the same directory is atomic and
+    doesn't depend on the size of the tree. Returns the trash path, or None if there was nothing to move.
+    """
+    if os.path.islink(path) or not os.path.isdir(path):
+        return None
+    head, tail = os.path.split(path)
+    trash_path = os.path.join(head, f'.{tail}.trash-{uuid.uuid4().hex}')
+    try:
+        os.rename(path, trash_path)
+    except OSError:
+        # e.g. no write permission on the parent, fall back to deleting in place
+        shutil.rmtree(path, ignore_errors=True)
+        return None
+    return trash_path
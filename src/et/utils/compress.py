@@ -1,24 +1,231 @@
 import _pickle as cPickle
+import io
+import lzma
+import os
+import struct
+import time
+import uuid
 import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, BinaryIO, Callable, Dict, List, NamedTuple, Tuple
 
-def compress_obj(obj):
+from loguru import logger
+
+# Compressed blobs start with MAGIC, the format version and the codec id, so `decompress_obj` knows how to decode them.
+# Blobs without it are from the old `zlib.compress(cPickle.dumps(obj))` format (zlib streams start with 0x78).
+MAGIC = b'ETZ'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<3sBB')
+_COUNT = struct.Struct('<I')
+_LENGTH = struct.Struct('<Q')
+PICKLE_PROTOCOL = 5
+# Chunk size when streaming compressed data from/to files
+STREAM_CHUNK_SIZE = 1 << 20
+# Segment count values with a special meaning: a single compressed stream (`dump_compressed`), or independently
+# compressed fixed-size frames with an index (`compress_obj(..., parallel=True)`)
+STREAMED = 0
+FRAMED = 0xFFFFFFFF
+DEFAULT_FRAME_SIZE = 4 << 20
+
+
+class Codec(NamedTuple):
+    id: int
+    # compress(data, level) -> bytes, decompress(data) -> bytes
+    compress: Callable
+    decompress: Callable
+    # Incremental versions. compressobj(level) has .compress(data) and .flush(), reader(fileobj) returns a raw binary
+    # stream decompressing fileobj with bounded memory
+    compressobj: Callable
+    reader: Callable
+
+
+def _zlib_compress(data, level):
+    return zlib.compress(data, -1 if level is None else level)
+
+
+def _zlib_compressobj(level):
+    return zlib.compressobj(-1 if level is None else level)
+
+
+class _ZlibReader(io.RawIOBase):
+    """
+    Read-only raw stream that incrementally decompresses a zlib stream from another file object.
+    """
+
+    def __init__(self, fileobj: BinaryIO):
+        self._fileobj = fileobj
+        self._decompressor = zlib.decompressobj()
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        decompressor = self._decompressor
+        while len(b) and not decompressor.eof:
+            # Bound the output by the read size, so highly compressible data doesn't blow up in memory
+            data = decompressor.unconsumed_tail or self._fileobj.read(STREAM_CHUNK_SIZE)
+            if not data:
+                raise EOFError("Compressed file ended before the end-of-stream marker was reached")
+            out = decompressor.decompress(data, len(b))
+            if out:
+                b[:len(out)] = out
+                return len(out)
+        return 0
+
+
+def _lzma_compress(data, level):
+    return lzma.compress(data, preset=level)
+
+
+def _lzma_compressobj(level):
+    return lzma.LZMACompressor(preset=level)
+
+
+def _lz4_compress(data, level):
+    import lz4.frame
+    return lz4.frame.compress(data, compression_level=level or 0)
+
+
+def _lz4_decompress(data):
+    import lz4.frame
+    return lz4.frame.decompress(data)
+
+
+class _LZ4Compressor:
+    """
+    Adapts `lz4.frame.LZ4FrameCompressor` (which needs an explicit `begin()`) to the compressobj interface.
+    """
+
+    def __init__(self, level):
+        import lz4.frame
+        self._compressor = lz4.frame.LZ4FrameCompressor(compression_level=level or 0)
+        self._header = self._compressor.begin()
+
+    def compress(self, data):
+        out = self._header + self._compressor.compress(data)
+        self._header = b''
+        return out
+
+    def flush(self):
+        return self._header + self._compressor.flush()
+
+
+def _lz4_reader(fileobj):
+    import lz4.frame
+    return lz4.frame.LZ4FrameFile(fileobj, mode='rb')
+
+
+def _zstd_compress(data, level):
+    import zstandard
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+
+def _zstd_decompress(data):
+    import zstandard
+    # Frames written by `compress` record their content size, so no max_output_size is needed
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _zstd_compressobj(level):
+    import zstandard
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compressobj()
+
+
+def _zstd_reader(fileobj):
+    import zstandard
+    return zstandard.ZstdDecompressor().stream_reader(fileobj, read_size=STREAM_CHUNK_SIZE, closefd=False)
+
+
+# lz4 and zstd need the `lz4`/`zstandard` packages (`pip install et[compress]`)
+CODECS: Dict[str, Codec] = {
+    'zlib': Codec(1, _zlib_compress, zlib.decompress, _zlib_compressobj, _ZlibReader),
+    'lzma': Codec(2, _lzma_compress, lzma.decompress, _lzma_compressobj, lzma.LZMAFile),
+    'lz4': Codec(3, _lz4_compress, _lz4_decompress, _LZ4Compressor, _lz4_reader),
+    'zstd': Codec(4, _zstd_compress, _zstd_decompress, _zstd_compressobj, _zstd_reader),
+}
+_CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+_CODEC_MODULES = {'lz4': 'lz4.frame', 'zstd': 'zstandard'}
+
+
+def available_codecs() -> List[str]:
+    """
+    List the codecs that can be used in this environment (lz4 and zstd are optional dependencies).
+
+    Returns
+    -------
+    list
+        Names of the usable codecs.
+    """
+    import importlib.util
+    codecs = []
+    for name in CODECS:
+        module = _CODEC_MODULES.get(name)
+        try:
+            if module is None or importlib.util.find_spec(module) is not None:
+                codecs.append(name)
+        except ModuleNotFoundError:
+            pass
+    return codecs
+
+
+def compress_obj(obj, codec: str = 'zlib', level: int = None, parallel: bool = False,
+                 frame_size: int = DEFAULT_FRAME_SIZE, max_workers: int = None, executor: Executor = None):
     """
     Compresses any python object and stores as a byte array (which supports byte-array comparison).
     Stolen from https://stackoverflow.com/questions/19500530/compress-python-object-in-memory.
 
+    The object is pickled with protocol 5, so large buffers (e.g. NumPy arrays) are passed out-of-band and compressed
+    straight from their memory instead of being copied into the pickle stream first. The result starts with a small
+    header recording the format version and codec, so `decompress_obj` picks the right decoder automatically.
+
+    With `parallel=True`, the serialized payload (the pickle stream followed by the out-of-band buffers) is split into
+    fixed-size frames that are compressed independently in a thread (or process) pool, and a frame index is written
+    up front. `decompress_obj` then decompresses the frames in parallel too, and `decompress_range` can read any byte
+    range of the payload by only inflating the frames it overlaps. Codecs release the GIL, so threads scale well.
+
     Parameters
     ----------
     obj: Any
         The object to compress.
+    codec: str
+        The compression codec, one of 'zlib', 'lzma', 'lz4' or 'zstd' (see `available_codecs`). lz4 and zstd are much
+        faster than zlib, lzma compresses best.
+    level: int
+        The compression level, or None for the codec's default.
+    parallel: bool
+        Whether to compress in parallel, independently compressed frames.
+    frame_size: int
+        The size in bytes of the uncompressed frames when `parallel=True`. Smaller frames parallelize better and make
+        random access cheaper, larger frames compress better.
+    max_workers: int
+        Number of threads when `parallel=True` and no executor is given. Defaults to the `ThreadPoolExecutor` default.
+    executor: concurrent.futures.Executor
+        Executor to compress the frames in, e.g. a `ProcessPoolExecutor` for codecs that hold the GIL.
 
     Returns
     -------
     bytes
         The compressed object
     """
-    return zlib.compress(cPickle.dumps(obj))
+    codec = _get_codec(codec)
+
+    buffers = []
+    stream = cPickle.dumps(obj, protocol=PICKLE_PROTOCOL, buffer_callback=buffers.append)
+    if parallel:
+        segments = [memoryview(stream)] + [buffer.raw() for buffer in buffers]
+        return _compress_framed(segments, codec, level, frame_size, max_workers, executor)
+
+    segments = [codec.compress(stream, level)] + [codec.compress(buffer.raw(), level) for buffer in buffers]
 
-def decompress_obj(compressed_obj):
+    return b''.join([
+        _HEADER.pack(MAGIC, FORMAT_VERSION, codec.id),
+        _COUNT.pack(len(segments)),
+        *(_LENGTH.pack(len(segment)) for segment in segments),
+        *segments,
+    ])
+
+
+def decompress_obj(compressed_obj, writable: bool = True, max_workers: int = None, executor: Executor = None):
     """
     Decompresses a compressed object that was compressed using the method above.
     Stolen from https://stackoverflow.com/questions/19500530/compress-python-object-in-memory.
@@ -35,10 +242,407 @@ def decompress_obj(compressed_obj):
     ----------
     compressed_obj: bytes
         The compressed object to decompress.
+    writable: bool
+        Whether out-of-band buffers (e.g. NumPy arrays) should be writable. If False, they are backed directly by the
+        decompressed bytes (read-only), which saves a copy.
+    max_workers: int
+        Number of threads to decompress frames with, for objects compressed with `parallel=True`.
+    executor: concurrent.futures.Executor
+        Executor to decompress frames in, for objects compressed with `parallel=True`.
 
     Returns
     -------
     Any
         The decompressed object.
     """
-    return cPickle.loads(zlib.decompress(compressed_obj))
\ No newline at end of file
+    view = memoryview(compressed_obj)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        return cPickle.loads(zlib.decompress(compressed_obj))
+
+    codec = _parse_header(view)
+    offset = _HEADER.size
+    count, = _COUNT.unpack_from(view, offset)
+    offset += _COUNT.size
+    if count == STREAMED:
+        # Written by `dump_compressed`: a single compressed pickle stream
+        return _load_stream(io.BytesIO(view[offset:]), codec)
+    if count == FRAMED:
+        stream, *buffers = _decompress_framed(view, max_workers=max_workers, executor=executor)
+        return cPickle.loads(stream, buffers=buffers)
+
+    lengths = [_LENGTH.unpack_from(view, offset + i * _LENGTH.size)[0] for i in range(count)]
+    offset += count * _LENGTH.size
+
+    segments = []
+    for length in lengths:
+        segments.append(codec.decompress(view[offset:offset + length]))
+        offset += length
+    stream, buffers = segments[0], segments[1:]
+    if writable:
+        buffers = [bytearray(buffer) for buffer in buffers]
+    return cPickle.loads(stream, buffers=buffers)
+
+
+def decompress_range(compressed_obj, start: int, stop: int, max_workers: int = None,
+                     executor: Executor = None) -> bytes:
+    """
+    Read the byte range [start, stop) of the serialized payload of an object compressed with `parallel=True`, only
+    inflating the frames that overlap it. The payload is the pickle stream followed by each out-of-band buffer, see
+    `get_frame_index` for where each of them starts.
+
+    Parameters
+    ----------
+    compressed_obj: bytes
+        The object compressed with `compress_obj(..., parallel=True)`.
+    start: int
+        Start of the byte range (inclusive).
+    stop: int
+        End of the byte range (exclusive).
+    max_workers: int
+        Number of threads to decompress frames with.
+    executor: concurrent.futures.Executor
+        Executor to decompress frames in.
+
+    Returns
+    -------
+    bytes
+        The requested bytes of the payload.
+    """
+    codec, frame_size, segment_sizes, frames = _read_frame_index(memoryview(compressed_obj))
+    stop = min(stop, sum(segment_sizes))
+    if start >= stop:
+        return b''
+    view = memoryview(compressed_obj)
+    # Frames overlapping the range, with their position in the payload
+    overlapping = [(payload_offset, view[comp_offset:comp_offset + comp_len])
+                   for _, payload_offset, _, raw_len, comp_offset, comp_len in frames
+                   if payload_offset < stop and payload_offset + raw_len > start]
+    inflated = _map(codec.decompress, [frame for _, frame in overlapping], max_workers, executor)
+    first_offset = overlapping[0][0]
+    return b''.join(inflated)[start - first_offset:stop - first_offset]
+
+
+def get_frame_index(compressed_obj) -> Dict[str, Any]:
+    """
+    Describe the layout of an object compressed with `parallel=True`.
+
+    Parameters
+    ----------
+    compressed_obj: bytes
+        The object compressed with `compress_obj(..., parallel=True)`.
+
+    Returns
+    -------
+    dict
+        The codec name, frame size, number of frames, and the payload offset and size of each segment (the pickle
+        stream first, then each out-of-band buffer).
+    """
+    codec, frame_size, segment_sizes, frames = _read_frame_index(memoryview(compressed_obj))
+    offsets = [sum(segment_sizes[:i]) for i in range(len(segment_sizes))]
+    return {
+        'codec': next(name for name, c in CODECS.items() if c is codec),
+        'frame_size': frame_size,
+        'frames': len(frames),
+        'segments': [{'offset': offset, 'size': size} for offset, size in zip(offsets, segment_sizes)],
+    }
+
+
+def _compress_framed(segments: List[memoryview], codec: Codec, level: int, frame_size: int, max_workers: int,
+                     executor: Executor) -> bytes:
+    """
+    Compress the segments as independent frames in parallel, behind an index of the frame sizes.
+    """
+    assert frame_size > 0, "frame_size must be positive."
+    frames = [segment[start:start + frame_size] for segment in segments for start in range(0, len(segment), frame_size)]
+    compressed = _map(codec.compress, frames, max_workers, executor, level)
+    return b''.join([
+        _HEADER.pack(MAGIC, FORMAT_VERSION, codec.id),
+        _COUNT.pack(FRAMED),
+        _LENGTH.pack(frame_size),
+        _COUNT.pack(len(segments)),
+        *(_LENGTH.pack(len(segment)) for segment in segments),
+        *(_LENGTH.pack(len(frame)) for frame in compressed),
+        *compressed,
+    ])
+
+
+def _read_frame_index(view: memoryview) -> Tuple[Codec, int, List[int], List[Tuple[int, int, int, int, int, int]]]:
+    """
+    Parse the header and frame index of a framed object. Each frame is described by (segment, payload offset,
+    offset in segment, uncompressed size, offset in the blob, compressed size).
+    """
+    if bytes(view[:len(MAGIC)]) != MAGIC or _COUNT.unpack_from(view, _HEADER.size)[0] != FRAMED:
+        raise ValueError("Object was not compressed with `compress_obj(..., parallel=True)`.")
+    codec = _parse_header(view)
+    offset = _HEADER.size + _COUNT.size
+    frame_size, = _LENGTH.unpack_from(view, offset)
+    offset += _LENGTH.size
+    n_segments, = _COUNT.unpack_from(view, offset)
+    offset += _COUNT.size
+    segment_sizes = [_LENGTH.unpack_from(view, offset + i * _LENGTH.size)[0] for i in range(n_segments)]
+    offset += n_segments * _LENGTH.size
+
+    layout = [(segment, start, min(frame_size, size - start))
+              for segment, size in enumerate(segment_sizes) for start in range(0, size, frame_size)]
+    comp_lengths = [_LENGTH.unpack_from(view, offset + i * _LENGTH.size)[0] for i in range(len(layout))]
+    comp_offset = offset + len(layout) * _LENGTH.size
+
+    frames = []
+    segment_offsets = [sum(segment_sizes[:i]) for i in range(n_segments)]
+    for (segment, start, raw_len), comp_len in zip(layout, comp_lengths):
+        frames.append((segment, segment_offsets[segment] + start, start, raw_len, comp_offset, comp_len))
+        comp_offset += comp_len
+    return codec, frame_size, segment_sizes, frames
+
+
+def _decompress_framed(view: memoryview, max_workers: int = None, executor: Executor = None) -> List[bytearray]:
+    """
+    Decompress all frames of a framed object in parallel, straight into one preallocated buffer per segment.
+    """
+    codec, _, segment_sizes, frames = _read_frame_index(view)
+    segments = [bytearray(size) for size in segment_sizes]
+
+    if isinstance(executor, ProcessPoolExecutor):
+        inflated = _map(codec.decompress, [view[o:o + n] for *_, o, n in frames], max_workers, executor)
+        for (segment, _, start, raw_len, _, _), data in zip(frames, inflated):
+            segments[segment][start:start + raw_len] = data
+        return segments
+
+    def _inflate(frame):
+        segment, _, start, raw_len, comp_offset, comp_len = frame
+        # Each frame fills its own disjoint slice, so threads don't need to synchronize
+        segments[segment][start:start + raw_len] = codec.decompress(view[comp_offset:comp_offset + comp_len])
+
+    _map(_inflate, frames, max_workers, executor)
+    return segments
+
+
+def _map(fn: Callable, items: list, max_workers: int = None, executor: Executor = None, *args) -> list:
+    """
+    Map fn over items (with extra args) in the given executor, or in a temporary thread pool.
+    """
+    if isinstance(executor, ProcessPoolExecutor):
+        # Memoryviews can't be pickled to send to the worker processes
+        items = [bytes(item) if isinstance(item, memoryview) else item for item in items]
+    extra = [[arg] * len(items) for arg in args]
+    if executor is not None:
+        return list(executor.map(fn, items, *extra))
+    if len(items) <= 1:
+        return list(map(fn, items, *extra))
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(fn, items, *extra))
+
+
+def benchmark_compression(obj=None, codecs: List[str] = None, frame_size: int = DEFAULT_FRAME_SIZE,
+                          max_workers: int = None, trials: int = 3) -> Dict[str, Dict[str, float]]:
+    """
+    Compare the throughput of serial `compress_obj` against parallel framed compression, for each codec.
+
+    Example usage:
+    ```
+    python -m et.utils.compress
+    ```
+
+    Parameters
+    ----------
+    obj: Any
+        The object to benchmark with. Defaults to 64 MB of moderately compressible NumPy data.
+    codecs: list
+        The codecs to benchmark. Defaults to all available codecs.
+    frame_size: int
+        The frame size for parallel compression.
+    max_workers: int
+        Number of threads for parallel compression.
+    trials: int
+        Number of trials, the best one is reported.
+
+    Returns
+    -------
+    dict
+        For each codec and mode, the compression ratio and the compression/decompression throughput in MB/s.
+    """
+    from et.utils.vis import pprint_table
+
+    if obj is None:
+        import numpy as np
+        rng = np.random.default_rng(0)
+        obj = {'data': rng.integers(0, 16, size=64 << 20, dtype=np.uint8), 'meta': {'step': 0}}
+    size = len(cPickle.dumps(obj, protocol=PICKLE_PROTOCOL))
+
+    def best_time(fn):
+        times = []
+        for _ in range(trials):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    results = {}
+    for codec in codecs or available_codecs():
+        for parallel in (False, True):
+            kwargs = dict(codec=codec, parallel=parallel, frame_size=frame_size, max_workers=max_workers)
+            compress_time, blob = best_time(lambda: compress_obj(obj, **kwargs))
+            decompress_time, _ = best_time(lambda: decompress_obj(blob, max_workers=max_workers))
+            results[f"{codec} ({'parallel' if parallel else 'serial'})"] = {
+                'ratio': size / len(blob),
+                'compress (MB/s)': size / compress_time / 1e6,
+                'decompress (MB/s)': size / decompress_time / 1e6,
+            }
+    logger.info(f"Compression benchmark on {size / 1e6:.1f} MB, frame size {frame_size / 1e6:.1f} MB")
+    pprint_table(results, sort_metrics=False)
+    return results
+
+
+def dump_compressed(obj, path_or_fileobj: str | os.PathLike | BinaryIO, codec: str = 'zlib', level: int = None,
+                    atomic: bool = False):
+    """
+    Compress any python object straight into a file. The object is pickled directly into an incremental compressor
+    that writes to the file in chunks, so unlike `compress_obj` neither the whole pickle nor the whole compressed blob
+    is ever held in memory. Peak memory stays close to the size of the object itself.
+
+    Parameters
+    ----------
+    obj: Any
+        The object to compress.
+    path_or_fileobj: str | os.PathLike | BinaryIO
+        The path of the file to write, or a file object opened in binary write mode.
+    codec: str
+        The compression codec, see `compress_obj`.
+    level: int
+        The compression level, or None for the codec's default.
+    atomic: bool
+        Whether to write to a temporary file and rename it over the path when done, so that readers (and crashes) never
+        see a partially written file. Only supported for paths. Recommended for checkpoints.
+    """
+    codec = _get_codec(codec)
+    if not isinstance(path_or_fileobj, (str, os.PathLike)):
+        if atomic:
+            raise ValueError("Atomic writes are only supported when passing a path.")
+        return _dump_compressed(obj, path_or_fileobj, codec, level)
+
+    path = os.fspath(path_or_fileobj)
+    if not atomic:
+        with open(path, 'wb') as f:
+            return _dump_compressed(obj, f, codec, level)
+
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            _dump_compressed(obj, f, codec, level)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_compressed(path_or_fileobj: str | os.PathLike | BinaryIO) -> Any:
+    """
+    Load an object written by `dump_compressed`, decompressing the file incrementally while unpickling. Files
+    containing a `compress_obj` blob are supported too (but are loaded in one go).
+
+    Parameters
+    ----------
+    path_or_fileobj: str | os.PathLike | BinaryIO
+        The path of the file to read, or a file object opened in binary read mode.
+
+    Returns
+    -------
+    Any
+        The decompressed object.
+    """
+    if isinstance(path_or_fileobj, (str, os.PathLike)):
+        with open(path_or_fileobj, 'rb') as f:
+            return load_compressed(f)
+
+    f = path_or_fileobj
+    prefix = f.read(_HEADER.size + _COUNT.size)
+    if prefix[:len(MAGIC)] != MAGIC:
+        return decompress_obj(prefix + f.read())
+    codec = _parse_header(prefix)
+    count, = _COUNT.unpack_from(prefix, _HEADER.size)
+    if count > 0:
+        return decompress_obj(prefix + f.read())
+    return _load_stream(f, codec)
+
+
+def _dump_compressed(obj, fileobj: BinaryIO, codec: Codec, level: int):
+    fileobj.write(_HEADER.pack(MAGIC, FORMAT_VERSION, codec.id))
+    fileobj.write(_COUNT.pack(0))  # No segments, a single compressed stream follows
+    writer = _CompressWriter(fileobj, codec.compressobj(level))
+    cPickle.Pickler(writer, protocol=PICKLE_PROTOCOL).dump(obj)
+    writer.flush()
+
+
+class _CompressWriter:
+    """
+    Write-only file object that compresses everything written to it into another file object.
+    """
+
+    def __init__(self, fileobj: BinaryIO, compressor):
+        self._fileobj = fileobj
+        self._compressor = compressor
+
+    def write(self, data) -> int:
+        # The pickler hands large buffers (e.g. array data) over without copying them, feed them to the compressor in
+        # chunks so the compressed output is written out incrementally too
+        view = memoryview(data).cast('B')
+        for start in range(0, len(view), STREAM_CHUNK_SIZE):
+            out = self._compressor.compress(view[start:start + STREAM_CHUNK_SIZE])
+            if out:
+                self._fileobj.write(out)
+        return len(view)
+
+    def flush(self):
+        self._fileobj.write(self._compressor.flush())
+
+
+def _load_stream(fileobj: BinaryIO, codec: Codec) -> Any:
+    with io.BufferedReader(_ChunkedReader(codec.reader(fileobj)), buffer_size=STREAM_CHUNK_SIZE) as reader:
+        return cPickle.load(reader)
+
+
+class _ChunkedReader(io.RawIOBase):
+    """
+    Caps every read from a decompressing stream at STREAM_CHUNK_SIZE. The unpickler reads large buffers (e.g. array
+    data) straight into their final memory, without this the decompressors would inflate the whole buffer into a
+    temporary first and double the peak memory.
+    """
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    def readable(self):
+        return True
+
+    def readinto(self, b) -> int:
+        return self._raw.readinto(memoryview(b)[:STREAM_CHUNK_SIZE])
+
+    def close(self):
+        self._raw.close()
+        super().close()
+
+
+def _get_codec(name: str) -> Codec:
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec '{name}', expected one of {list(CODECS)}.")
+    return CODECS[name]
+
+
+def _parse_header(data) -> Codec:
+    """
+    Validate the header of a compressed object and return its codec.
+    """
+    _, version, codec_id = _HEADER.unpack_from(data)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Compressed object has format version {version}, but only up to {FORMAT_VERSION} is "
+                         f"supported. Upgrade et to decompress it.")
+    if codec_id not in _CODECS_BY_ID:
+        raise ValueError(f"Compressed object uses an unknown codec id {codec_id}.")
+    return _CODECS_BY_ID[codec_id]
+
+
+if __name__ == '__main__':
+    benchmark_compression()
@@ -1,18 +1,34 @@
-from typing import Any
+import _pickle as cPickle
+import os
+from collections.abc import Mapping, MutableMapping
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple, Union
 
 import yaml
 
 from dotwiz import DotWiz
 
+# Use the libyaml-backed loader when PyYAML was built with it, it's an order of magnitude faster
+YAML_LOADER = getattr(yaml, 'CFullLoader', yaml.FullLoader)
+# real path -> (mtime_ns, size, pickled parsed data). The parsed data is kept pickled so every load gets its own copy,
+# unpickling is much faster than parsing (or deep copying)
+_yaml_cache: Dict[str, Tuple[int, int, bytes]] = {}
+_MISS = object()
 
-def load_yaml(filepath: str, **kwargs: Any) -> DotWiz:
+
+def load_yaml(filepath: str, cache: bool = True, **kwargs: Any) -> DotWiz:
     """
     Load a yaml file and return a DotWiz dictionary. More info on DotWiz can be found at https://github.com/rnag/dotwiz.
 
+    Parsed configs are cached by path, mtime and size, so loading an unchanged file again skips parsing. Every call
+    still returns a new DotWiz, so mutating a loaded config never affects later loads.
+
     Parameters:
     ----------
     filepath: str
         The path to the yaml file to load.
+    cache: bool
+        Whether to use the parsed-config cache.
     kwargs: Any
         Any additional keyword arguments to pass to the DotWiz dictionary.
 
@@ -21,26 +37,126 @@ def load_yaml(filepath: str, **kwargs: Any) -> DotWiz:
     DotWiz
         A DotWiz dictionary containing the yaml file data.
     """
-    return convert_to_dotwiz(yaml.load(open(filepath, 'r'), Loader=yaml.FullLoader), **kwargs)
+    if not cache:
+        return convert_to_dotwiz(_parse_yaml(filepath), **kwargs)
+
+    key, st = os.path.realpath(filepath), os.stat(filepath)
+    data = _get_cached(key, st)
+    if data is _MISS:
+        data = _parse_yaml(filepath)
+        _put_cached(key, st, data)
+    return convert_to_dotwiz(data, **kwargs)
+
+
+def load_yaml_many(filepaths: List[str], max_workers: int = None, use_processes: bool = False,
+                   **kwargs: Any) -> List[DotWiz]:
+    """
+    Load many yaml files in parallel, see `load_yaml`. Cached files are not parsed again.
+
+    Parameters:
+    ----------
+    filepaths: list
+        The paths to the yaml files to load.
+    max_workers: int
+        Number of parsing workers. Defaults to the executor's default.
+    use_processes: bool
+        Whether to parse in a process pool instead of a thread pool. Parsing is CPU bound, so this scales better for
+        many large files, at the cost of sending the parsed data back to this process.
+    kwargs: Any
+        Any additional keyword arguments to pass to the DotWiz dictionaries.
+
+    Returns:
+    -------
+    list
+        The DotWiz dictionaries, in the same order as filepaths.
+    """
+    parsed, to_parse = {}, []
+    for filepath in dict.fromkeys(filepaths):
+        key, st = os.path.realpath(filepath), os.stat(filepath)
+        data = _get_cached(key, st)
+        if data is _MISS:
+            to_parse.append((filepath, key, st))
+        else:
+            parsed[filepath] = data
+
+    if to_parse:
+        executor_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_cls(max_workers=max_workers) as executor:
+            for (filepath, key, st), data in zip(to_parse, executor.map(_parse_yaml, [f for f, _, _ in to_parse])):
+                parsed[filepath] = data
+                _put_cached(key, st, data)
+
+    # A new DotWiz per path, and a fresh copy of the data for repeated paths, so no two results share objects
+    results, seen = [], set()
+    for filepath in filepaths:
+        data = parsed[filepath]
+        if filepath in seen:
+            data = cPickle.loads(cPickle.dumps(data, protocol=5))
+        seen.add(filepath)
+        results.append(convert_to_dotwiz(data, **kwargs))
+    return results
+
+
+def clear_yaml_cache():
+    """
+    Clear the parsed-config cache of `load_yaml`.
+    """
+    _yaml_cache.clear()
+
+
+def _parse_yaml(filepath: str) -> Any:
+    with open(filepath, 'r') as f:
+        return yaml.load(f, Loader=YAML_LOADER)
+
+
+def _get_cached(key: str, st: os.stat_result) -> Any:
+    """
+    Get a fresh copy of the cached parsed data of a file, or _MISS if it isn't cached or has changed since.
+    """
+    cached = _yaml_cache.get(key)
+    if cached is None or cached[:2] != (st.st_mtime_ns, st.st_size):
+        return _MISS
+    return cPickle.loads(cached[2])
+
+
+def _put_cached(key: str, st: os.stat_result, data: Any):
+    try:
+        _yaml_cache[key] = (st.st_mtime_ns, st.st_size, cPickle.dumps(data, protocol=5))
+    except Exception:
+        # e.g. python/object tags constructing unpicklable objects, just don't cache those
+        _yaml_cache.pop(key, None)
 
 
-def convert_to_dotwiz(data: dict | Any, **kwargs: Any) -> DotWiz:
+def convert_to_dotwiz(data: dict | Any, lazy: bool = False, copy_on_write: bool = False,
+                      **kwargs: Any) -> Union[DotWiz, 'DotWizView']:
     """
     Convert a dictionary to a DotWiz dictionary. More info on DotWiz can be found at https://github.com/rnag/dotwiz.
 
+    With `lazy=True`, nothing is copied up front: a `DotWizView` wrapping the original data is returned instead, which
+    converts nested dicts/objects into views only when they are first accessed. Much cheaper for large nested results
+    of which only a few fields are read.
+
     Parameters:
     ----------
     data: dict | Any
         The dictionary to convert to a DotWiz dictionary. Add Any typing in case it's something like a dataclass
         (but needs __dict__ property implemented).
+    lazy: bool
+        Whether to return a lazy `DotWizView` instead of an eagerly converted DotWiz.
+    copy_on_write: bool
+        With `lazy=True`, whether writes to the view (at any depth) are kept in the view instead of modifying data.
     kwargs: Any
-        Any additional keyword arguments to pass to the DotWiz dictionary.
+        Any additional keyword arguments to pass to the DotWiz dictionary. These are extra top-level entries, so they
+        are not passed down to nested dictionaries.
 
     Returns:
     -------
-    DotWiz
-        A DotWiz dictionary containing the data from the input dictionary.
+    DotWiz | DotWizView
+        A DotWiz dictionary (or lazy view) containing the data from the input dictionary.
     """
+    if lazy:
+        return DotWizView(data, copy_on_write=copy_on_write, **kwargs) if _is_nested(data) else data
+
     if not isinstance(data, dict):
         try:
             data = data.__dict__
@@ -52,3 +168,135 @@ def convert_to_dotwiz(data: dict | Any, **kwargs: Any) -> DotWiz:
     for key, value in data.items():
         return_dict[key] = convert_to_dotwiz(value)
     return DotWiz(**dict(return_dict, **kwargs))
+
+
+class DotWizView(MutableMapping):
+    """
+    Lazy, attribute-accessible view over a (nested) dictionary or object, see `convert_to_dotwiz(..., lazy=True)`.
+    Nested dicts/objects are wrapped in views on first access and cached, nothing is copied.
+
+    By default, writes go through to the underlying data. With `copy_on_write=True`, writes and deletes (at any depth)
+    are recorded in the view instead, so the source data is never modified.
+
+    Example usage:
+    ```
+    results = {'train': {'loss': [...], 'step': 100}}
+    view = convert_to_dotwiz(results, lazy=True, copy_on_write=True)
+    view.train.step = 0
+    assert results['train']['step'] == 100
+    ```
+    """
+
+    __slots__ = ('_source', '_children', '_overlay', '_deleted', '_cow')
+
+    def __init__(self, data: Mapping | Any, copy_on_write: bool = False, **kwargs: Any):
+        source = data if isinstance(data, Mapping) else data.__dict__
+        object.__setattr__(self, '_source', source)
+        object.__setattr__(self, '_children', {})
+        # Extra entries and copy-on-write writes live in the overlay, deleted source keys in _deleted
+        object.__setattr__(self, '_overlay', dict(kwargs))
+        object.__setattr__(self, '_deleted', set())
+        object.__setattr__(self, '_cow', copy_on_write)
+
+    def __getitem__(self, key):
+        if key in self._overlay:
+            value = self._overlay[key]
+            if _is_nested(value) and not isinstance(value, DotWizView):
+                value = self._overlay[key] = DotWizView(value, copy_on_write=self._cow)
+            return value
+        if key in self._deleted:
+            raise KeyError(key)
+        child = self._children.get(key)
+        if child is not None:
+            return child
+        value = self._source[key]
+        if _is_nested(value):
+            value = self._children[key] = DotWizView(value, copy_on_write=self._cow)
+        return value
+
+    def __setitem__(self, key, value):
+        self._children.pop(key, None)
+        if self._cow or key in self._overlay:
+            self._overlay[key] = value
+            self._deleted.discard(key)
+        else:
+            self._source[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._children.pop(key, None)
+        self._overlay.pop(key, None)
+        if key in self._source:
+            if self._cow:
+                self._deleted.add(key)
+            else:
+                del self._source[key]
+
+    def __contains__(self, key):
+        return key in self._overlay or (key in self._source and key not in self._deleted)
+
+    def __iter__(self):
+        source, deleted = self._source, self._deleted
+        yield from (key for key in source if key not in deleted)
+        yield from (key for key in self._overlay if key not in source)
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __getattr__(self, name):
+        # Private names are never keys, e.g. copy/pickle probe for them before the slots are set
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __setattr__(self, name, value):
+        self[name] = value
+
+    def __delattr__(self, name):
+        try:
+            del self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __dir__(self):
+        return list(super().__dir__()) + [key for key in self if isinstance(key, str)]
+
+    def __reduce__(self):
+        # The default reduce of a slotted object restores the slots with setattr, which would go through __setitem__
+        return _restore_view, (self._source, dict(self._children), dict(self._overlay), set(self._deleted), self._cow)
+
+    def __repr__(self):
+        return f"✫({', '.join(f'{key}={self[key]!r}' for key in self)})"
+
+    def to_dict(self) -> dict:
+        """
+        Materialize the view (including copy-on-write changes) as plain nested dictionaries.
+        """
+        return {key: value.to_dict() if isinstance(value, DotWizView) else value for key, value in self.items()}
+
+    def to_dotwiz(self) -> DotWiz:
+        """
+        Materialize the view as an eagerly converted DotWiz.
+        """
+        return convert_to_dotwiz(self.to_dict())
+
+
+def _restore_view(source, children: dict, overlay: dict, deleted: set, copy_on_write: bool) -> DotWizView:
+    """
+    Rebuild a `DotWizView` from its state, for copy and pickle.
+    """
+    view = DotWizView.__new__(DotWizView)
+    for name, value in zip(DotWizView.__slots__, (source, children, overlay, deleted, copy_on_write)):
+        object.__setattr__(view, name, value)
+    return view
+
+
+def _is_nested(value: Any) -> bool:
+    """
+    Whether `convert_to_dotwiz` would convert value into a (nested) DotWiz.
+    """
+    return isinstance(value, (Mapping, DotWizView)) or hasattr(value, '__dict__')
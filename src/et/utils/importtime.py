@@ -0,0 +1,89 @@
+import re
+import subprocess
+import sys
+from typing import Dict
+
+from loguru import logger
+
+# Import time budgets in milliseconds of the public entry points, measured in a fresh interpreter. They include shared
+# dependencies like loguru (~60ms) and NumPy (~90ms), and leave headroom for slower machines.
+IMPORT_TIME_BUDGETS_MS = {
+    'et': 20,
+    'et.os.mkdir': 50,
+    'et.os.cp': 250,
+    'et.decorators.span': 50,
+    'et.decorators.timeit': 250,
+    'et.decorators.disk_cache': 300,
+    'et.utils.compress': 250,
+    'et.utils.dotwiz': 250,
+    'et.utils.lists': 100,
+    'et.utils.metrics': 150,
+    'et.utils.setup': 250,
+    'et.utils.seed': 400,
+    'et.utils.vis': 500,
+    'et.utils.wandb': 250,
+}
+
+_IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)')
+
+
+def measure_import_time(module: str, repeat: int = 3) -> float:
+    """
+    Measure the cumulative import time of a module (including all of its dependencies) with `python -X importtime`, in
+    a fresh interpreter.
+
+    Parameters
+    ----------
+    module : str
+        Module to import.
+    repeat : int
+        Number of measurements. The minimum is returned, the others are mostly noise (cold disk cache, etc.).
+
+    Returns
+    -------
+    float
+        Import time in milliseconds.
+    """
+    times = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                capture_output=True, text=True, check=True)
+        cumulative = [int(match.group(2)) for match in map(_IMPORTTIME_LINE.match, result.stderr.splitlines())
+                      if match and match.group(3) == module]
+        # Top-level imports are reported last
+        times.append(cumulative[-1] / 1e3)
+    return min(times)
+
+
+def check_import_times(budgets: Dict[str, float] = None, repeat: int = 3) -> Dict[str, float]:
+    """
+    Regression check that importing each public entry point stays under its import time budget, i.e. that no heavy
+    dependency sneaks back into a module-level import. Run it with `python -m et.utils.importtime`, which exits with an
+    error if a budget is exceeded.
+
+    Parameters
+    ----------
+    budgets : dict
+        Module -> import time budget in milliseconds. Defaults to IMPORT_TIME_BUDGETS_MS.
+    repeat : int
+        Number of measurements per module, see `measure_import_time`.
+
+    Returns
+    -------
+    dict
+        Module -> import time in milliseconds of the modules over budget.
+    """
+    budgets = budgets or IMPORT_TIME_BUDGETS_MS
+    over_budget = {}
+    for module, budget in budgets.items():
+        ms = measure_import_time(module, repeat=repeat)
+        if ms > budget:
+            over_budget[module] = ms
+            logger.error(f"import {module}: {ms:.1f}ms > {budget}ms budget")
+        else:
+            logger.info(f"import {module}: {ms:.1f}ms (budget {budget}ms)")
+    return over_budget
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check_import_times() else 0)
@@ -1,58 +1,220 @@
-from collections.abc import Iterable, Callable
+import _pickle as cPickle
+import bisect
+import math
+from collections import defaultdict
+from collections.abc import Iterable, Callable, Iterator, Mapping
 from operator import eq
-from typing import TypeVar, Union, List
+from typing import Any, Tuple, TypeVar, Union, List
 
 from treelib import Tree, Node
 
 T = TypeVar("T")
 
 
-def flatten_list(lst: Iterable) -> Iterable:
+def flatten_list(lst: Iterable, atomic_types: Tuple[type, ...] = (str, bytes), as_array: bool = False) -> Iterable:
     """
     Flatten an arbitrarily nested Python list of elements. Places no assumptions on the type of the list other than it
     is an iterable, but all iterables in this list must be of the same type then.
 
     e.g. if `type(lst) == list`, then all elements in lst must be lists as well.
 
-    Adapted from stolen code on the internet.
+    Adapted from stolen code on the internet. Uses `iter_flatten`, so arbitrarily deep lists are fine.
 
     Parameters
     ----------
     lst : list
         A nested list of elements. The tree structure of the list can be arbitrarily complex.
+    atomic_types : tuple
+        Iterable types to treat as leaves instead of flattening, see `iter_flatten`.
+    as_array : bool
+        Whether to return a 1-D NumPy array instead. When the leaves are arrays or numeric lists (e.g. a list of arrays,
+        or a regular nested list of numbers), this uses NumPy's concatenation instead of iterating in Python.
 
     Returns
     -------
-    list
+    list | np.ndarray
         A flattened list of elements.
     """
-    if not isinstance(lst, Iterable):
-        return [lst]
+    if as_array:
+        return _flatten_numpy(lst, atomic_types)
+    return list(iter_flatten(lst, atomic_types))
+
+
+def iter_flatten(lst: Iterable, atomic_types: Tuple[type, ...] = (str, bytes)) -> Iterator:
+    """
+    Lazily flatten an arbitrarily nested iterable, yielding its leaves in order. Uses an explicit stack of iterators
+    instead of recursion, so it handles any depth without `RecursionError` and never builds intermediate lists.
+
+    Example usage:
+    ```
+    list(iter_flatten([1, [2, [3, 'abc']], (4,)]))  # [1, 2, 3, 'abc', 4]
+    list(iter_flatten([np.zeros(2), [np.ones(2)]], atomic_types=(str, bytes, np.ndarray)))  # [array, array]
+    ```
+
+    Parameters
+    ----------
+    lst : Iterable
+        A nested iterable. A non-iterable (or atomic) lst is yielded as is.
+    atomic_types : tuple
+        Iterable types to treat as leaves instead of flattening. Strings and bytes by default, since a one-character
+        string is itself iterable. Add e.g. `np.ndarray` to keep arrays whole.
 
-    result = []
-    for item in lst:
-        result.extend(flatten_list(item))
-    return result
+    Returns
+    -------
+    Iterator
+        The leaves of lst.
+    """
+    stack = [iter((lst,))]
+    while stack:
+        for item in stack[-1]:
+            if isinstance(item, Iterable) and not isinstance(item, atomic_types):
+                stack.append(iter(item))
+                break
+            yield item
+        else:
+            stack.pop()
 
 
-def remove_duplicates(lst: Iterable) -> List:
+def _flatten_numpy(lst: Iterable, atomic_types: Tuple[type, ...]) -> Any:
+    """
+    Flatten into a 1-D NumPy array, using NumPy's vectorized conversion when possible.
+    """
+    import numpy as np
+
+    # Regular nested numeric lists (or lists of same-shape arrays) convert in one go
+    try:
+        arr = np.asarray(lst)
+        if arr.dtype != object:
+            return arr.ravel()
+    except ValueError:  # Ragged
+        pass
+    # Lists of arrays or numeric lists of different shapes: concatenate the flattened pieces
+    if isinstance(lst, Iterable) and not isinstance(lst, atomic_types):
+        try:
+            pieces = [np.asarray(item).ravel() for item in lst]
+            if pieces and all(piece.dtype != object for piece in pieces):
+                return np.concatenate(pieces)
+        except ValueError:
+            pass
+    return np.asarray(list(iter_flatten(lst, atomic_types)))
+
+
+def remove_duplicates(lst: Iterable, key: Callable = None) -> List:
     """
     Remove duplicates from a 1D-list while preserving the order of the elements.
     Taken from https://stackoverflow.com/questions/480214/how-do-i-remove-duplicates-from-a-list-while-preserving-order
 
+    Unhashable elements (lists, dicts, arrays, ...) are supported by comparing a hashable serialization of them. 1-D
+    NumPy arrays are deduplicated with a vectorized `np.unique` (and returned as an array).
+
     Parameters
     ----------
     lst : list
         A list of elements.
+    key : callable
+        Function mapping an element to what it is compared by, e.g. `lambda run: run['id']`. The first element of each
+        key is kept.
 
     Returns
     -------
     list
         A list of elements with duplicates removed.
     """
-    seen = set()
-    seen_add = seen.add
-    return [x for x in lst if not (x in seen or seen_add(x))]
+    if key is None and type(lst).__module__ == 'numpy' and getattr(lst, 'ndim', None) == 1:
+        import numpy as np
+        _, first = np.unique(lst, return_index=True)
+        return lst[np.sort(first)]
+
+    if key is None:
+        # Fast path for hashable elements, which falls back to iter_unique on the first unhashable one. Iterators are
+        # materialized first, since a partially consumed one can't be restarted.
+        if not isinstance(lst, (list, tuple)):
+            lst = list(lst)
+        seen = set()
+        seen_add = seen.add
+        try:
+            return [x for x in lst if not (x in seen or seen_add(x))]
+        except TypeError:
+            pass
+    return list(iter_unique(lst, key=key))
+
+
+def iter_unique(iterable: Iterable, key: Callable = None, approximate: bool = False, capacity: int = 1_000_000,
+                error_rate: float = 1e-3) -> Iterator:
+    """
+    Lazily remove duplicates from a (possibly unbounded) iterable while preserving order, see `remove_duplicates`.
+
+    With `approximate=True`, seen elements are tracked in a fixed-size Bloom filter instead of a set, so memory stays
+    bounded no matter how long the stream is. Duplicates are still never yielded, but a small fraction (about
+    `error_rate` while fewer than `capacity` unique elements have been seen) of unique elements are wrongly dropped.
+
+    Parameters
+    ----------
+    iterable : Iterable
+        The elements.
+    key : callable
+        Function mapping an element to what it is compared by.
+    approximate : bool
+        Whether to use a bounded-memory Bloom filter instead of an exact set.
+    capacity : int
+        With `approximate=True`, the expected number of unique elements.
+    error_rate : float
+        With `approximate=True`, the target rate of unique elements wrongly dropped.
+
+    Returns
+    -------
+    Iterator
+        The unique elements.
+    """
+    seen = _BloomFilter(capacity, error_rate) if approximate else set()
+    for x in iterable:
+        k = _to_hashable(x if key is None else key(x))
+        if k not in seen:
+            seen.add(k)
+            yield x
+
+
+def _to_hashable(x: Any) -> Any:
+    """
+    Map x to a hashable value that is equal for equal values of x, serializing unhashable containers and arrays.
+    """
+    try:
+        hash(x)
+        return x
+    except TypeError:
+        pass
+    if isinstance(x, Mapping):
+        return '__mapping__', frozenset((_to_hashable(k), _to_hashable(v)) for k, v in x.items())
+    if isinstance(x, (set, frozenset)):
+        return '__set__', frozenset(map(_to_hashable, x))
+    if hasattr(x, 'dtype') and hasattr(x, 'tobytes'):  # NumPy arrays (and the like)
+        return '__array__', str(x.dtype), x.shape, x.tobytes()
+    if isinstance(x, Iterable):
+        return '__sequence__', tuple(map(_to_hashable, x))
+    return '__pickle__', cPickle.dumps(x)
+
+
+class _BloomFilter:
+    """
+    Minimal Bloom filter over Python hashes, with the set interface `iter_unique` needs.
+    """
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, x):
+        # Double hashing: the i-th hash is h1 + i * h2
+        h1, h2 = hash(x), hash((x, 0x9E3779B9)) | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, x):
+        for pos in self._positions(x):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, x) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(x))
 
 
 def pprint_tree_level_sets(lst, return_str=False):
@@ -117,10 +279,126 @@ def find_nested_index(lst: Iterable[T], target: T, eq_op: Callable = eq) -> Unio
         A list representing the nested index of the target element, or None if not found.
     """
     for i, item in enumerate(lst):
-        if isinstance(item, Iterable):
-            result = find_nested_index(item, target)
+        if isinstance(item, Iterable) and not isinstance(item, (str, bytes)):
+            result = find_nested_index(item, target, eq_op)
             if result is not None:
                 return [i] + result
         elif eq_op(item, target):
             return [i]
     return None
+
+
+class NestedIndex:
+    """
+    Precomputed lookup structure for finding elements in an arbitrarily nested list. Built once in O(N), after which
+    each lookup is an O(1) dict access instead of the full scan `find_nested_index` does on every call.
+
+    Leaves must be hashable, or a `key` function mapping them to something hashable must be given (this replaces the
+    custom `eq_op` of `find_nested_index`: two leaves match if their keys are equal).
+
+    Example usage:
+    ```
+    lst = [1, [2, [3, 2]]]
+    index = NestedIndex(lst)
+    index.find(2)  # [1, 0]
+    index.find_all(2)  # [[1, 0], [1, 1, 1]]
+    index.append(4, parent=[1, 1])  # lst == [1, [2, [3, 2, 4]]]
+    index.find(4)  # [1, 1, 2]
+    ```
+
+    Parameters
+    ----------
+    lst : list
+        The nested list to index. Must only be appended to through `append`/`extend` to keep the index in sync.
+    key : callable
+        Function mapping a leaf to the hashable key it is looked up by. Defaults to the leaf itself.
+    atomic_types : tuple
+        Iterable types to treat as leaves, see `iter_flatten`.
+    """
+
+    def __init__(self, lst: List, key: Callable = None, atomic_types: Tuple[type, ...] = (str, bytes)):
+        self.lst = lst
+        self.key = key
+        self.atomic_types = atomic_types
+        self._paths = defaultdict(list)  # key -> index paths of its leaves, in depth-first order
+        self._size = 0
+        self._index(lst, ())
+
+    def _index(self, lst: Iterable, prefix: Tuple[int, ...], start: int = 0, incremental: bool = False):
+        """
+        Index the leaves of lst (from child `start` on), whose own index path is prefix. The initial build visits the
+        leaves in depth-first order, so their paths are appended. Leaves added later (`incremental`) may come before
+        existing ones in depth-first order, and since index paths compare in that order, they're inserted in place.
+        """
+        add = bisect.insort if incremental else list.append
+        stack = [(enumerate(lst), prefix)] if start == 0 else [(enumerate(lst[start:], start), prefix)]
+        while stack:
+            items, path = stack[-1]
+            for i, item in items:
+                if isinstance(item, Iterable) and not isinstance(item, self.atomic_types):
+                    stack.append((enumerate(item), path + (i,)))
+                    break
+                k = item if self.key is None else self.key(item)
+                try:
+                    add(self._paths[k], path + (i,))
+                except TypeError:
+                    raise TypeError(f"Unhashable leaf {item!r}, pass a `key` function to NestedIndex.") from None
+                self._size += 1
+            else:
+                stack.pop()
+
+    def _key(self, target: T):
+        return target if self.key is None else self.key(target)
+
+    def find(self, target: T) -> Union[List[int], None]:
+        """
+        Find the nested index of the first occurrence (in depth-first order) of target, like `find_nested_index`.
+
+        Returns
+        -------
+        list
+            A list representing the nested index of the target element, or None if not found.
+        """
+        paths = self._paths.get(self._key(target))
+        return list(paths[0]) if paths else None
+
+    def find_all(self, target: T) -> List[List[int]]:
+        """
+        Find the nested indices of all occurrences of target, in depth-first order.
+        """
+        return [list(path) for path in self._paths.get(self._key(target), ())]
+
+    def find_many(self, targets: Iterable[T]) -> List[Union[List[int], None]]:
+        """
+        Find the nested index of the first occurrence of each of the targets.
+        """
+        return [self.find(target) for target in targets]
+
+    def append(self, item: Any, parent: Iterable[int] = ()):
+        """
+        Append item (a leaf or a nested list) to the list at the nested index parent, and index it.
+        """
+        parent = tuple(parent)
+        node = self.lst
+        for i in parent:
+            node = node[i]
+        node.append(item)
+        self._index(node, parent, start=len(node) - 1, incremental=True)
+
+    def extend(self, items: Iterable, parent: Iterable[int] = ()):
+        """
+        Append each of items to the list at the nested index parent, and index them.
+        """
+        parent = tuple(parent)
+        node = self.lst
+        for i in parent:
+            node = node[i]
+        start = len(node)
+        node.extend(items)
+        self._index(node, parent, start=start, incremental=True)
+
+    def __contains__(self, target: T) -> bool:
+        return self._key(target) in self._paths
+
+    def __len__(self) -> int:
+        return self._size
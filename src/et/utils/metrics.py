@@ -0,0 +1,351 @@
+import abc
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Tuple
+
+from loguru import logger
+
+# Only needed for annotations, importing wandb takes seconds
+if TYPE_CHECKING:
+    from wandb.sdk.wandb_run import Run
+
+# (step, metrics, wall time) as written to the sinks, the wall time being that of the last `log` call of the window
+Record = Tuple[int, Dict[str, Any], float]
+
+REDUCTIONS = ('mean', 'min', 'max', 'sum', 'last', 'count')
+_FLUSH = object()
+_CLOSE = object()
+# Loggers not closed yet, closed at interpreter exit. Weak, so that registering doesn't keep them alive.
+_open_loggers = weakref.WeakSet()
+_atexit_registered = False
+
+
+class MetricsLogger:
+    """
+    Asynchronous, batched metrics logger. `log` only puts the metrics in a bounded queue, so it's cheap enough for the
+    hot path of a training loop. A background thread merges them into per-step dicts, aggregates scalars over windows
+    of steps and writes the results to the sinks (wandb, TensorBoard, JSONL) in batches, so slow logging doesn't show up
+    as step time jitter.
+
+    Scalars logged in the same window (e.g. a loss logged at every step with window=100) are reduced to one value per
+    reduction: the first reduction is written under the metric's name, the others under '{name}/{reduction}'.
+    Non-scalar values (e.g. wandb.Image) are passed through as is, the last one of the window wins.
+
+    Loggers still open at interpreter exit are closed then, so what is still queued is written even without `close`.
+    Prefer closing it explicitly (or using it as a context manager), e.g. before `run.finish()` for a `WandbSink`.
+
+    Example usage:
+    ```
+    run = wandb.init(...)
+    setup_wandb_run(run)
+    with MetricsLogger([WandbSink(run), JsonlSink('metrics.jsonl')], window=100, reductions=('mean', 'max')) as metrics:
+        for step in range(num_steps):
+            ...
+            metrics.log({'loss': loss, 'grad_norm': grad_norm}, step=step)
+    ```
+
+    Parameters
+    ----------
+    sinks : list
+        Sinks to write the metrics to, see `JsonlSink`, `WandbSink` and `TensorBoardSink`. A single sink also works.
+    window : int
+        Number of steps to aggregate scalars over. 1 still merges the metrics logged at the same step.
+    reductions : Sequence[str]
+        Reductions of the scalars of a window, among 'mean', 'min', 'max', 'sum', 'last' and 'count'.
+    queue_size : int
+        Maximum number of `log` calls waiting for the background thread.
+    policy : str
+        What `log` does when the queue is full: 'block' until there is room, or 'drop' the metrics (counted in
+        `dropped`).
+    flush_interval : float
+        Maximum number of seconds completed windows wait before being written to the sinks.
+    max_batch : int
+        Maximum number of records written to the sinks at once.
+    """
+
+    def __init__(self, sinks: 'Sink | List[Sink]', window: int = 1, reductions: Sequence[str] = ('mean',),
+                 queue_size: int = 10_000, policy: str = 'block', flush_interval: float = 1.0, max_batch: int = 1000):
+        assert window >= 1, "window should be at least 1."
+        assert policy in ('block', 'drop'), "policy should be 'block' or 'drop'."
+        assert reductions and all(r in REDUCTIONS for r in reductions), f"reductions should be among {REDUCTIONS}."
+        self.sinks = list(sinks) if isinstance(sinks, (list, tuple)) else [sinks]
+        self.window = window
+        self.reductions = tuple(reductions)
+        self.policy = policy
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._step = -1
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='et-metrics-logger', daemon=True)
+        self._thread.start()
+        _register_at_exit(self)
+
+    def log(self, metrics: Dict[str, Any], step: int = None):
+        """
+        Log metrics at a step.
+
+        Parameters
+        ----------
+        metrics : dict
+            Metric name -> value. Scalars (Python/NumPy numbers, 0-d arrays/tensors) are aggregated over the window.
+        step : int
+            Step of the metrics. Defaults to the step after the last logged one.
+        """
+        if self._closed:
+            raise RuntimeError("Logging to a closed MetricsLogger.")
+        self._step = self._step + 1 if step is None else step
+        item = (self._step, dict(metrics), time.time())
+        if self.policy == 'block':
+            self._queue.put(item)
+            return
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            if self.dropped == 0:
+                logger.warning("MetricsLogger queue is full, dropping metrics. Increase queue_size or the window.")
+            self.dropped += 1
+
+    def flush(self):
+        """
+        Write everything logged so far to the sinks (including the current, incomplete window) and flush them. Blocks
+        until done.
+        """
+        if self._closed:
+            return
+        done = threading.Event()
+        self._queue.put((_FLUSH, done, None))
+        done.wait()
+
+    def close(self):
+        """
+        Flush and close the sinks, and stop the background thread.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        _open_loggers.discard(self)
+        self._queue.put((_CLOSE, None, None))
+        self._thread.join()
+        if self.dropped:
+            logger.warning(f"MetricsLogger dropped {self.dropped} log calls.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def _run(self):
+        # Windows being aggregated, window index -> [last step, {name: [sum, count, min, max, last]}, {name: value},
+        # last wall time]
+        windows = {}
+        batch: List[Record] = []
+        last_write = time.monotonic()
+        while True:
+            try:
+                step, metrics, wall_time = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                step = metrics = wall_time = None
+
+            if step is _FLUSH or step is _CLOSE:
+                batch += self._reduce(windows.pop(index) for index in sorted(windows))
+                self._write(batch, flush=True)
+                batch, last_write = [], time.monotonic()
+                if step is _CLOSE:
+                    for sink in self.sinks:
+                        self._call(sink, 'close')
+                    return
+                metrics.set()
+                continue
+
+            if metrics is not None:
+                index = step // self.window
+                # A new window means the previous ones are complete (steps are expected to increase)
+                for done in [i for i in windows if i < index]:
+                    batch += self._reduce([windows.pop(done)])
+                self._accumulate(windows.setdefault(index, [step, {}, {}, wall_time]), step, metrics, wall_time)
+
+            if batch and (len(batch) >= self.max_batch or time.monotonic() - last_write >= self.flush_interval):
+                self._write(batch)
+                batch, last_write = [], time.monotonic()
+
+    @staticmethod
+    def _accumulate(window: list, step: int, metrics: Dict[str, Any], wall_time: float):
+        window[0] = max(window[0], step)
+        window[3] = wall_time
+        scalars, others = window[1], window[2]
+        for name, value in metrics.items():
+            value = _to_scalar(value)
+            if value is None:
+                others[name] = metrics[name]
+                continue
+            acc = scalars.get(name)
+            if acc is None:
+                scalars[name] = [value, 1, value, value, value]
+            else:
+                acc[0] += value
+                acc[1] += 1
+                acc[2] = min(acc[2], value)
+                acc[3] = max(acc[3], value)
+                acc[4] = value
+
+    def _reduce(self, windows) -> List[Record]:
+        records = []
+        for step, scalars, others, wall_time in windows:
+            metrics = dict(others)
+            for name, (total, count, lo, hi, last) in scalars.items():
+                values = {'mean': total / count, 'min': lo, 'max': hi, 'sum': total, 'last': last, 'count': count}
+                metrics[name] = values[self.reductions[0]]
+                for reduction in self.reductions[1:]:
+                    metrics[f'{name}/{reduction}'] = values[reduction]
+            records.append((step, metrics, wall_time))
+        return records
+
+    def _write(self, batch: List[Record], flush: bool = False):
+        for sink in self.sinks:
+            if batch:
+                self._call(sink, 'write', batch)
+            if flush:
+                self._call(sink, 'flush')
+
+    @staticmethod
+    def _call(sink, method: str, *args):
+        # A failing sink must not kill the logging thread (and with it the other sinks)
+        try:
+            getattr(sink, method)(*args)
+        except Exception as e:
+            logger.warning(f"{type(sink).__name__}.{method} failed: {e!r}")
+
+
+def _register_at_exit(metrics_logger: MetricsLogger):
+    global _atexit_registered
+    _open_loggers.add(metrics_logger)
+    if not _atexit_registered:
+        atexit.register(_close_open_loggers)
+        _atexit_registered = True
+
+
+def _close_open_loggers():
+    for metrics_logger in list(_open_loggers):
+        metrics_logger.close()
+
+
+def _to_scalar(value) -> float | None:
+    """
+    Convert a Python/NumPy number or a 0-d array/tensor to a float, or return None if it isn't a scalar.
+    """
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return value
+    if getattr(value, 'ndim', None) == 0 or getattr(value, 'shape', None) == ():
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class Sink(abc.ABC):
+    """
+    Base class of the `MetricsLogger` sinks. `write` is called from the logger's background thread with batches of
+    (step, metrics, wall_time) records, wall_time being the time.time() at which the metrics were logged (the last
+    `log` call of their window), not the time they are written.
+    """
+
+    @abc.abstractmethod
+    def write(self, records: List[Record]):
+        pass
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.flush()
+
+
+class JsonlSink(Sink):
+    """
+    Append the metrics to a local JSON Lines file, one `{"step": ..., **metrics}` object per line. Useful to log
+    offline, or to test the logging without a network.
+
+    Parameters
+    ----------
+    path : str
+        Path of the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'a', buffering=1 << 16)
+
+    def write(self, records: List[Record]):
+        self._file.write(''.join(json.dumps({'step': step, **metrics}, default=str) + '\n'
+                                 for step, metrics, _ in records))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class WandbSink(Sink):
+    """
+    Log the metrics to a wandb run (e.g. set up with `setup_wandb_run`).
+
+    Parameters
+    ----------
+    run : wandb.sdk.wandb_run.Run
+        The run object from wandb.
+    """
+
+    def __init__(self, run: 'Run'):
+        self.run = run
+
+    def write(self, records: List[Record]):
+        for step, metrics, _ in records:
+            self.run.log(metrics, step=step)
+
+
+class TensorBoardSink(Sink):
+    """
+    Write the scalar metrics to TensorBoard event files. Uses the writer of the tensorboard package directly, so it
+    doesn't need PyTorch or TensorFlow. Non-scalar metrics are skipped.
+
+    Parameters
+    ----------
+    log_dir : str
+        Directory of the event files.
+    """
+
+    def __init__(self, log_dir: str):
+        from tensorboard.summary.writer.event_file_writer import EventFileWriter
+
+        self.log_dir = log_dir
+        self._writer = EventFileWriter(log_dir)
+
+    def write(self, records: List[Record]):
+        from tensorboard.compat.proto.event_pb2 import Event
+        from tensorboard.compat.proto.summary_pb2 import Summary
+
+        for step, metrics, wall_time in records:
+            values = [Summary.Value(tag=name, simple_value=scalar) for name, value in metrics.items()
+                      if (scalar := _to_scalar(value)) is not None]
+            if values:
+                self._writer.add_event(Event(wall_time=wall_time, step=step, summary=Summary(value=values)))
+
+    def flush(self):
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
@@ -1,11 +1,15 @@
 import os
 import random
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence
 
 import numpy as np
-from gymnasium import Env
-from gymnasium.vector import VectorEnv
 from loguru import logger
 
+# Only needed for annotations, importing gymnasium is slow
+if TYPE_CHECKING:
+    from gymnasium import Env
+    from gymnasium.vector import VectorEnv
+
 
 def set_seed(seed: int = 0, use_torch: bool = False, verbose=True):
     """
@@ -26,7 +30,7 @@ def set_seed(seed: int = 0, use_torch: bool = False, verbose=True):
         torch.backends.cudnn.benchmark = False
 
 
-def set_env_seed(env: Env | VectorEnv, seed: int):
+def set_env_seed(env: 'Env | VectorEnv', seed: int):
     """
     Set the gymnasium env seed
     """
@@ -34,3 +38,225 @@ def set_env_seed(env: Env | VectorEnv, seed: int):
     env.reset(seed=seed)
     logger.info(f"Fixed env seed to {seed}")
     return env
+
+
+def spawn_seed_sequences(seed: int | np.random.SeedSequence, n: int) -> List[np.random.SeedSequence]:
+    """
+    Spawn n independent child seed sequences from a root seed, with `np.random.SeedSequence.spawn`. Unlike seeding
+    workers with seed, seed + 1, ..., the streams of the children are statistically independent, and spawning more
+    children later (e.g. for new workers) never reuses a stream.
+
+    Parameters
+    ----------
+    seed : int | np.random.SeedSequence
+        Root seed.
+    n : int
+        Number of children.
+
+    Returns
+    -------
+    List[np.random.SeedSequence]
+        The children. The i-th child is the same as `worker_seed_sequence(seed, i)`.
+    """
+    root = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    return root.spawn(n)
+
+
+def worker_seed_sequence(seed: int, worker_id: int) -> np.random.SeedSequence:
+    """
+    Seed sequence of one worker, without spawning the others. Handy in a process pool initializer that only knows its
+    worker id: it gets the same stream as the worker_id-th child of `spawn_seed_sequences(seed, n)`.
+
+    Parameters
+    ----------
+    seed : int
+        Root seed, shared by all workers.
+    worker_id : int
+        Index of the worker.
+
+    Returns
+    -------
+    np.random.SeedSequence
+        Seed sequence of the worker.
+    """
+    return np.random.SeedSequence(seed, spawn_key=(worker_id,))
+
+
+def spawn_generators(seed: int | np.random.SeedSequence, n: int) -> List[np.random.Generator]:
+    """
+    Create n independent random generators (e.g. one per worker or sub-env) from a root seed.
+
+    Example usage:
+    ```
+    rngs = spawn_generators(cfg.seed, num_workers)
+    with ProcessPoolExecutor(num_workers) as executor:
+        results = list(executor.map(rollout, range(num_workers), rngs))
+    ```
+
+    Parameters
+    ----------
+    seed : int | np.random.SeedSequence
+        Root seed.
+    n : int
+        Number of generators.
+
+    Returns
+    -------
+    List[np.random.Generator]
+        Independent generators.
+    """
+    return [np.random.default_rng(child) for child in spawn_seed_sequences(seed, n)]
+
+
+def spawn_int_seeds(seed: int | np.random.SeedSequence, n: int) -> List[int]:
+    """
+    Derive n independent integer seeds from a root seed, for APIs that only take integers (e.g. `env.reset(seed=...)`).
+
+    Parameters
+    ----------
+    seed : int | np.random.SeedSequence
+        Root seed.
+    n : int
+        Number of seeds.
+
+    Returns
+    -------
+    List[int]
+        Independent 64-bit seeds.
+    """
+    return [int(child.generate_state(1, np.uint64)[0]) for child in spawn_seed_sequences(seed, n)]
+
+
+def seed_vector_env(env: 'VectorEnv', seed: int | np.random.SeedSequence, verbose: bool = True) -> 'VectorEnv':
+    """
+    Seed all the sub-envs of a gymnasium VectorEnv in one batched reset, each with an independent seed derived from
+    `seed` (instead of seed, seed + 1, ... like `env.reset(seed=seed)`). The batched action space, the single action
+    space and, for a SyncVectorEnv, the action space of each sub-env are seeded too.
+
+    The action spaces of the sub-envs of an AsyncVectorEnv live in the worker processes and can't be seeded from here,
+    sample from `env.action_space` instead.
+
+    Parameters
+    ----------
+    env : VectorEnv
+        Vectorized env.
+    seed : int | np.random.SeedSequence
+        Root seed.
+    verbose : bool
+        Whether to log the seed.
+
+    Returns
+    -------
+    VectorEnv
+        The seeded env.
+    """
+    # One seed per sub-env and per sub-env action space, then the batched and single action spaces
+    n = env.num_envs
+    seeds = spawn_int_seeds(seed, 2 * n + 2)
+    env.reset(seed=seeds[:n])
+    env.action_space.seed(seeds[-2])
+    env.single_action_space.seed(seeds[-1])
+    for sub_env, sub_seed in zip(getattr(env.unwrapped, 'envs', ()), seeds[n:2 * n]):
+        sub_env.action_space.seed(sub_seed)
+    if verbose:
+        logger.info(f"Fixed the seeds of {env.num_envs} envs from seed {seed}")
+    return env
+
+
+def get_rng_state(generators: Sequence[np.random.Generator] = (), env: 'Env | VectorEnv' = None,
+                  use_torch: bool = False) -> Dict[str, Any]:
+    """
+    Snapshot the full RNG state, for checkpointing: the global `random` and `np.random` states, the states of the
+    given generators, and optionally of an env and of torch. For an env, that's its np_random (or those of all its
+    sub-envs) and the action spaces seeded by `seed_vector_env`: the (batched) action space, the single action space
+    of a VectorEnv and the action space of each sub-env of a SyncVectorEnv. Generator states are just their bit
+    generator's state dicts, so this is cheap and picklable.
+
+    Parameters
+    ----------
+    generators : Sequence[np.random.Generator]
+        Generators to snapshot, e.g. from `spawn_generators`.
+    env : Env | VectorEnv
+        Env to snapshot.
+    use_torch : bool
+        Whether to snapshot the torch (and CUDA) RNG states.
+
+    Returns
+    -------
+    dict
+        The RNG state, to restore with `set_rng_state`.
+    """
+    state = {
+        'random': random.getstate(),
+        'numpy': np.random.get_state(),
+        'generators': [rng.bit_generator.state for rng in generators],
+    }
+    if env is not None:
+        rngs = env.get_attr('np_random') if hasattr(env, 'num_envs') else [env.np_random]
+        state['env'] = {
+            'np_random': [rng.bit_generator.state for rng in rngs],
+            'action_spaces': [space.np_random.bit_generator.state for space in _action_spaces(env)],
+        }
+    if use_torch:
+        import torch
+        state['torch'] = torch.get_rng_state()
+        if torch.cuda.is_available():
+            state['torch_cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state: Dict[str, Any], generators: Sequence[np.random.Generator] = (),
+                  env: 'Env | VectorEnv' = None):
+    """
+    Restore an RNG state snapshot taken with `get_rng_state`. The generators are restored in place, so they must be
+    given in the same order as when the snapshot was taken.
+
+    Parameters
+    ----------
+    state : dict
+        The RNG state.
+    generators : Sequence[np.random.Generator]
+        Generators to restore.
+    env : Env | VectorEnv
+        Env to restore.
+    """
+    random.setstate(state['random'])
+    np.random.set_state(state['numpy'])
+    assert len(generators) == len(state['generators']), \
+        f"Expected {len(state['generators'])} generators, got {len(generators)}."
+    for rng, rng_state in zip(generators, state['generators']):
+        rng.bit_generator.state = rng_state
+    if env is not None:
+        assert 'env' in state, "The snapshot doesn't contain an env state."
+        rngs = [_generator_from_state(rng_state) for rng_state in state['env']['np_random']]
+        if hasattr(env, 'num_envs'):
+            env.set_attr('np_random', rngs)
+        else:
+            env.np_random = rngs[0]
+        spaces = _action_spaces(env)
+        assert len(spaces) == len(state['env']['action_spaces']), "The env doesn't match the snapshot."
+        for space, space_state in zip(spaces, state['env']['action_spaces']):
+            space.np_random.bit_generator.state = space_state
+    if 'torch' in state:
+        import torch
+        torch.set_rng_state(state['torch'])
+        if 'torch_cuda' in state:
+            torch.cuda.set_rng_state_all(state['torch_cuda'])
+
+
+def _action_spaces(env: 'Env | VectorEnv') -> list:
+    """
+    The action spaces of an env with their own RNG: its action space, and for a VectorEnv its single action space and
+    the action spaces of its sub-envs when they live in this process (SyncVectorEnv).
+    """
+    spaces = [env.action_space]
+    if hasattr(env, 'num_envs'):
+        spaces.append(env.single_action_space)
+        spaces += [sub_env.action_space for sub_env in getattr(env.unwrapped, 'envs', ())]
+    return spaces
+
+
+def _generator_from_state(state: Dict[str, Any]) -> np.random.Generator:
+    bit_generator = getattr(np.random, state['bit_generator'])()
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
@@ -1,17 +1,22 @@
-from typing import Tuple, Dict, Any, Union
+import collections
+import os
+import queue
+import shutil
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Tuple, Dict, Any, Union, Iterable, Iterator, Callable, List
 
-import ffmpeg
-import imageio
-import matplotlib.figure
 import numpy as np
-from PrettyPrint import PrettyPrintTree
 from loguru import logger
-from prettytable import PrettyTable
 
-from et.utils.lists import remove_duplicates
+# ffmpeg-python, imageio, matplotlib and PrettyPrintTree are imported where they are used, so importing this module
+# (e.g. only for pprint_table) stays cheap
+if TYPE_CHECKING:
+    import matplotlib.figure
 
 
-def pprint_table(data: Dict[Any, Dict[Any, Any]], sort_metrics: bool = True) -> None:
+def pprint_table(data: Dict[Any, Dict[Any, Any]], sort_metrics: bool = True, max_width: int = None) -> None:
     """
     Pretty print a 2-D table of data.
 
@@ -38,23 +43,229 @@ def pprint_table(data: Dict[Any, Dict[Any, Any]], sort_metrics: bool = True) ->
 
     sort_metrics : bool
         Whether to sort the metrics alphabetically.
+    max_width : int
+        If given, tables wider than this many characters are split into pages of columns, see `Table`.
     """
-    # Get all listed metrics across methods
-    metrics = []
-    for keys in data.values():
-        metrics += list(keys.keys())
-    metrics = remove_duplicates(metrics)
-    metrics = [''] + (sorted(metrics) if sort_metrics else list(metrics))
+    table = Table(sort_columns=sort_metrics, max_width=max_width)
+    table.add_rows(data)
+    logger.info('\n' + table.render())
 
-    t = PrettyTable(metrics)
-    for method in data:
-        row = [method] + [data[method][metric] if data[method].get(metric) is not None else '' for metric in
-                          metrics[1:]]
-        # Round floats by 3 decimal places
-        row = [round(x, 3) if isinstance(x, float) else x for x in row]
-        t.add_row(row)
 
-    logger.info('\n' + t.__repr__())
+class Table:
+    """
+    Incremental table renderer behind `pprint_table`, for large tables and for rows that arrive over time (e.g. one per
+    eval interval). Cells are formatted and column widths updated once, when a row is added, so adding a row costs the
+    same however large the table is, and rendering is a single pass over the formatted cells.
+
+    Rows can be streamed: `render_new_rows` renders the header the first time, then only the rows added since its
+    last call. The column widths are fixed the first time, so wider cells of later rows are truncated (give a
+    `min_col_width` to leave room).
+
+    Tables wider than `max_width` are split into pages of columns (repeating the row names), or truncated.
+
+    Example usage:
+    ```
+    table = Table(min_col_width=8)
+    for step in range(0, num_steps, eval_interval):
+        table.add_row(f'step {step}', evaluate())
+        logger.info('\n' + table.render_new_rows())
+    table.to_csv('eval.csv')
+    ```
+
+    Parameters
+    ----------
+    columns : Iterable
+        Initial columns, in order. Columns are otherwise added in the order they first appear in the rows.
+    sort_columns : bool
+        Whether to sort the columns alphabetically when rendering.
+    precision : int
+        Number of decimals to round floats to.
+    max_width : int
+        Maximum width of a rendered table in characters.
+    wide : str
+        What to do with tables wider than max_width: 'page' them, or 'truncate' the columns that don't fit.
+    min_col_width : int
+        Minimum width of the columns.
+    max_col_width : int
+        Maximum width of the columns. Longer cells are truncated.
+    """
+
+    def __init__(self, columns: Iterable = (), sort_columns: bool = False, precision: int = 3, max_width: int = None,
+                 wide: str = 'page', min_col_width: int = 0, max_col_width: int = None):
+        assert wide in ('page', 'truncate'), "wide should be 'page' or 'truncate'."
+        self.sort_columns = sort_columns
+        self.precision = precision
+        self.max_width = max_width
+        self.wide = wide
+        self.min_col_width = min_col_width
+        self.max_col_width = max_col_width
+        # Column -> width, in insertion order
+        self.widths = {}
+        # (name, values, formatted cells) of each row
+        self.rows = []
+        self._name_width = 0
+        self._streamed = 0
+        self._stream_layout = None
+        for column in columns:
+            self._update_width(column, 0)
+
+    def add_row(self, name: Any, values: Dict[Any, Any]) -> 'Table':
+        """
+        Add a row.
+
+        Parameters
+        ----------
+        name : Any
+            Name of the row, shown in the first column.
+        values : dict
+            Column -> value. Missing columns and None values are left empty.
+        """
+        cells = {}
+        for column, value in values.items():
+            cell = self._format(value)
+            cells[column] = cell
+            self._update_width(column, len(cell))
+        name = self._truncate(str(name))
+        self._name_width = max(self._name_width, len(name))
+        self.rows.append((name, values, cells))
+        return self
+
+    def add_rows(self, data: Dict[Any, Dict[Any, Any]]) -> 'Table':
+        """
+        Add rows, given as {row name: {column: value}} like `pprint_table`.
+        """
+        for name, values in data.items():
+            self.add_row(name, values)
+        return self
+
+    def render(self) -> str:
+        """
+        Render the whole table.
+        """
+        columns = self._columns()
+        widths = [self.widths[column] for column in columns]
+        pages = self._paginate(columns, widths)
+        rendered = []
+        for start, stop in pages:
+            page_widths = [self._name_width] + widths[start:stop]
+            rendered.append('\n'.join([
+                *self._render_header(columns[start:stop], page_widths),
+                *(self._render_line([name] + [cells.get(c, '') for c in columns[start:stop]], page_widths)
+                  for name, _, cells in self.rows),
+                self._render_border(page_widths),
+            ]))
+        if self.wide == 'truncate' and len(pages) > 1:
+            return rendered[0] + f"\n({len(columns) - pages[0][1]} more columns not shown)"
+        return '\n\n'.join(rendered)
+
+    def render_new_rows(self) -> str:
+        """
+        Render the rows added since the last call, preceded by the header on the first call, to stream the table. The
+        columns and their widths are those of the first call.
+        """
+        if self._stream_layout is None:
+            columns = self._columns()
+            widths = [self._name_width] + [self.widths[column] for column in columns]
+            _, stop = self._paginate(columns, widths[1:])[0]
+            columns, widths = columns[:stop], widths[:stop + 1]
+            self._stream_layout = columns, widths
+            lines = self._render_header(columns, widths)
+        else:
+            columns, widths = self._stream_layout
+            lines = []
+        for name, _, cells in self.rows[self._streamed:]:
+            lines.append(self._render_line([name] + [cells.get(c, '') for c in columns], widths, clip=True))
+        lines.append(self._render_border(widths))
+        self._streamed = len(self.rows)
+        return '\n'.join(lines)
+
+    def to_csv(self, path: str = None) -> str | None:
+        """
+        Export the table to CSV, with the raw (unrounded) values.
+
+        Parameters
+        ----------
+        path : str
+            Path to save the CSV to. If None, the CSV is returned as a string.
+        """
+        import csv
+        import io
+
+        columns = self._columns()
+        with (open(path, 'w', newline='') if path else io.StringIO()) as f:
+            writer = csv.writer(f)
+            writer.writerow([''] + columns)
+            writer.writerows([name] + ['' if values.get(c) is None else values[c] for c in columns]
+                             for name, values, _ in self.rows)
+            if path is None:
+                return f.getvalue()
+
+    def to_markdown(self) -> str:
+        """
+        Export the table to a Markdown table, with the same formatted cells as the rendered table.
+        """
+        columns = self._columns()
+        lines = ['| | ' + ' | '.join(map(_escape_markdown, columns)) + ' |', '|' + '---|' * (len(columns) + 1)]
+        lines += ['| ' + ' | '.join(map(_escape_markdown, [name] + [cells.get(c, '') for c in columns])) + ' |'
+                  for name, _, cells in self.rows]
+        return '\n'.join(lines)
+
+    def _format(self, value) -> str:
+        if value is None:
+            return ''
+        # Round floats by `precision` decimal places
+        if isinstance(value, float):
+            value = round(value, self.precision)
+        return self._truncate(str(value))
+
+    def _truncate(self, cell: str) -> str:
+        if self.max_col_width is not None and len(cell) > self.max_col_width:
+            return cell[:self.max_col_width - 1] + '…'
+        return cell
+
+    def _update_width(self, column, width: int):
+        current = self.widths.get(column)
+        if current is None:
+            self.widths[column] = max(width, len(self._truncate(str(column))), self.min_col_width)
+        elif width > current:
+            self.widths[column] = width
+
+    def _columns(self) -> list:
+        return sorted(self.widths, key=str) if self.sort_columns else list(self.widths)
+
+    def _paginate(self, columns: list, widths: List[int]) -> List[Tuple[int, int]]:
+        """
+        Split the columns into pages (start, stop) fitting max_width. Each page has at least one column.
+        """
+        if self.max_width is None:
+            return [(0, len(columns))]
+        pages, start, line_width = [], 0, self._name_width + 4
+        for i, width in enumerate(widths):
+            if line_width + width + 3 > self.max_width and i > start:
+                pages.append((start, i))
+                start, line_width = i, self._name_width + 4
+            line_width += width + 3
+        pages.append((start, len(columns)))
+        return pages
+
+    def _render_header(self, columns: list, widths: List[int]) -> List[str]:
+        border = self._render_border(widths)
+        header = self._render_line([''] + [self._truncate(str(column)) for column in columns], widths, clip=True)
+        return [border, header, border]
+
+    @staticmethod
+    def _render_border(widths: List[int]) -> str:
+        return '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+
+    @staticmethod
+    def _render_line(cells: List[str], widths: List[int], clip: bool = False) -> str:
+        if clip:
+            cells = [cell if len(cell) <= width else cell[:width - 1] + '…' for cell, width in zip(cells, widths)]
+        return '| ' + ' | '.join(cell.center(width) for cell, width in zip(cells, widths)) + ' |'
+
+
+def _escape_markdown(cell) -> str:
+    return str(cell).replace('|', '\\|')
 
 
 def pprint_tree(tree, get_children: callable, get_value: callable, return_str=False, **kwargs: Dict[str, Any]) -> Union[
@@ -122,6 +333,8 @@ def pprint_tree(tree, get_children: callable, get_value: callable, return_str=Fa
     str | None
         Pretty printed tree as a string if return_str is True, else None.
     """
+    from PrettyPrint import PrettyPrintTree
+
     # Update any kwargs if necessary
     match kwargs.get('orientation', None):
         case 'vertical':
@@ -204,6 +417,8 @@ def make_animation(frames: list, save_path, fps: int = 60):
     framerate : int
         Framerate of the video.
     """
+    import imageio
+
     kwargs = {}
     if str(save_path).lower().endswith(".gif"):
         kwargs["loop"] = 0   # 0 means infinite repeat, 1 means play once, 2 means repeat twice, etc.
@@ -212,9 +427,453 @@ def make_animation(frames: list, save_path, fps: int = 60):
     logger.info(f"Saved animation to {save_path}.")
 
 
+class VideoWriter:
+    """
+    Stream frames (RGB images) into a video one at a time, without holding them all in memory like `make_animation`.
+    Frames are piped as raw RGB into an ffmpeg subprocess by a background writer thread, so rendering and encoding
+    overlap, and a bounded queue between them keeps memory constant.
+
+    Example usage:
+    ```
+    with VideoWriter('video.mp4', fps=30) as writer:
+        for i in range(num_frames):
+            writer.write(render(i))
+    ```
+
+    Parameters
+    ----------
+    save_path : str
+        Path to save the video. The container/codec is picked by ffmpeg from the extension (e.g. .mp4, .webm, .gif).
+    fps : int
+        Framerate of the video.
+    queue_size : int
+        Maximum number of frames waiting to be encoded. `write` blocks while the queue is full.
+    copy_frames : bool
+        Whether to copy frames before queueing them. Needed if the caller reuses the same frame buffer (e.g. with
+        `extract_frame(fig, out=...)`), otherwise the frames are queued by reference.
+    output_kwargs : dict
+        Additional ffmpeg output options, e.g. `vcodec='libx264', crf=18`.
+    """
+
+    def __init__(self, save_path: str, fps: int = 60, queue_size: int = 32, copy_frames: bool = False,
+                 **output_kwargs: Any):
+        self.save_path = str(save_path)
+        self.fps = fps
+        self.copy_frames = copy_frames
+        self.output_kwargs = output_kwargs
+        self.num_frames = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._process = None
+        self._thread = None
+        self._shape = None
+        self._error = None
+        self._warned_ring = False
+
+    def _start(self, height: int, width: int):
+        import ffmpeg
+
+        stream = ffmpeg.input('pipe:', format='rawvideo', pix_fmt='rgb24', s=f'{width}x{height}', framerate=self.fps)
+        self._process = (
+            self._output(stream)
+            .overwrite_output()
+            .run_async(cmd=_ffmpeg_exe(), pipe_stdin=True, pipe_stderr=True)
+        )
+        self._thread = threading.Thread(target=self._write_loop, name='et-video-writer', daemon=True)
+        self._thread.start()
+
+    def _output(self, stream):
+        """
+        Build the ffmpeg output of the raw frame stream.
+        """
+        output_kwargs = dict(self.output_kwargs)
+        if not self.save_path.lower().endswith('.gif'):
+            # Most codecs need yuv420p (and so even dimensions) to be playable everywhere
+            output_kwargs.setdefault('pix_fmt', 'yuv420p')
+            output_kwargs.setdefault('vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2')
+        return stream.output(self.save_path, loglevel='error', **output_kwargs)
+
+    def _write_loop(self):
+        stdin = self._process.stdin
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                break
+            # After an error, keep draining the queue so the producer never blocks forever
+            if self._error is None:
+                try:
+                    stdin.write(frame.data)
+                except Exception as e:
+                    self._error = e
+
+    def write(self, frame: np.ndarray):
+        """
+        Queue a frame for encoding.
+
+        Parameters
+        ----------
+        frame : np.ndarray
+            RGB (or RGBA, alpha is dropped) uint8 image of shape (H, W, 3). All frames must have the same shape.
+        """
+        if self._error is not None:
+            raise RuntimeError(f"Writing {self.save_path} failed.") from self._error
+        frame = np.asarray(frame)
+        if frame.ndim != 3 or frame.shape[-1] not in (3, 4):
+            raise ValueError(f"Expected an RGB frame of shape (H, W, 3), got {frame.shape}.")
+        frame = frame[..., :3]
+        if self._shape is None:
+            self._shape = frame.shape
+            self._start(*frame.shape[:2])
+        elif frame.shape != self._shape:
+            raise ValueError(f"All frames must have the same shape, expected {self._shape}, got {frame.shape}.")
+        if frame.dtype != np.uint8 or not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame, dtype=np.uint8)
+        elif self.copy_frames or self._ring_too_small(frame):
+            frame = frame.copy()
+        self._queue.put(frame)
+        self.num_frames += 1
+
+    def _ring_too_small(self, frame: np.ndarray) -> bool:
+        """
+        Whether frame is a buffer of a `FrameRing` too small to be queued without copying: the writer thread holds one
+        frame, the queue up to queue_size more, and the producer fills the next one while blocked on a full queue.
+        """
+        ring = _find_frame_ring(frame)
+        if ring is None or len(ring) >= self._queue.maxsize + 2:
+            return False
+        if not self._warned_ring:
+            logger.warning(f"FrameRing of size {len(ring)} is too small to be queued without copying, copying frames. "
+                           f"Use a size of at least queue_size + 2 = {self._queue.maxsize + 2}.")
+            self._warned_ring = True
+        return True
+
+    def write_all(self, frames: Iterable[np.ndarray]):
+        """
+        Queue all frames of an iterable (e.g. a generator rendering them on the fly) for encoding.
+        """
+        for frame in frames:
+            self.write(frame)
+
+    def close(self):
+        """
+        Finish encoding the queued frames and wait for the video to be written.
+        """
+        if self._process is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._process.stdin.close()
+        stderr = self._process.stderr.read()
+        returncode = self._process.wait()
+        self._process = None
+        if self._error is not None or returncode != 0:
+            raise RuntimeError(f"ffmpeg failed to write {self.save_path}: {stderr.decode(errors='replace')}") \
+                from self._error
+        logger.info(f"Saved animation to {self.save_path} ({self.num_frames} frames).")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+def _ffmpeg_exe() -> str:
+    """
+    Path of the ffmpeg binary, preferring the system one, else the one bundled with imageio-ffmpeg.
+    """
+    exe = shutil.which('ffmpeg')
+    if exe is None:
+        import imageio_ffmpeg
+        exe = imageio_ffmpeg.get_ffmpeg_exe()
+    return exe
+
+
+# Figure reused across the frames rendered by a `render_frames` worker process
+_worker_fig = None
+_worker_plot_fn = None
+_worker_clear = True
+
+
+def render_frames(plot_fn: Callable[['matplotlib.figure.Figure', int], Any], num_iterations: int,
+                  iter_stepsize: int = 1, max_workers: int | None = None, figsize: Tuple[float, float] = None,
+                  dpi: int = 100, setup_fn: Callable[['matplotlib.figure.Figure'], Any] = None,
+                  max_pending: int = None) -> Iterator[np.ndarray]:
+    """
+    Render matplotlib frames in parallel in a process pool, yielding them (as RGB images) in order. Each step of the
+    `recommend_fps` schedule, i.e. `range(iter_stepsize, num_iterations + iter_stepsize, iter_stepsize)` (with the
+    last step clamped to num_iterations), is one frame.
+
+    Each worker process creates one Agg figure and reuses it for all of its frames, so the figure creation cost is paid
+    once per worker. By default the figure is cleared before each frame and `plot_fn` draws it from scratch. If
+    `setup_fn` is given, it is called once per worker to create the axes/artists instead, and the figure is not cleared,
+    so `plot_fn` can just update the artists (e.g. with `set_data`), which is much faster still.
+
+    `plot_fn` and `setup_fn` must be picklable, i.e. defined at module level (use `functools.partial` to bind data).
+
+    Example usage:
+    ```
+    def plot(fig, i, data):
+        ax = fig.subplots()
+        ax.plot(data[:i])
+
+    iter_stepsize, fps, num_frames = recommend_fps(len(data), 100, 5, 10)
+    frames = render_frames(functools.partial(plot, data=data), len(data), iter_stepsize)
+    with VideoWriter('video.mp4', fps=fps) as writer:
+        writer.write_all(frames)
+    ```
+
+    Parameters
+    ----------
+    plot_fn : callable
+        Function `plot_fn(fig, i)` drawing the frame of iteration i on the figure.
+    num_iterations : int
+        Number of potential frames, as passed to `recommend_fps`.
+    iter_stepsize : int
+        Iteration stepsize returned by `recommend_fps`.
+    max_workers : int | None
+        Number of worker processes. Defaults to the number of CPUs. 0 renders in the current process (for debugging).
+    figsize : tuple
+        Size of the figure in inches. Defaults to matplotlib's default.
+    dpi : int
+        Resolution of the figure.
+    setup_fn : callable
+        Function `setup_fn(fig)` called once per worker to set up the figure, see above.
+    max_pending : int
+        Maximum number of frames rendered ahead of the consumer, which bounds memory when encoding is slower than
+        rendering. Defaults to twice the number of workers.
+
+    Yields
+    ------
+    np.ndarray
+        RGB image of shape (H, W, 3), dtype=uint8, for each step in order.
+    """
+    # Clamp the last step, which overshoots when iter_stepsize doesn't divide num_iterations
+    steps = [min(i, num_iterations) for i in range(iter_stepsize, num_iterations + iter_stepsize, iter_stepsize)]
+    init_args = (plot_fn, setup_fn, figsize, dpi)
+
+    if max_workers == 0:
+        _init_render_worker(*init_args)
+        for i in steps:
+            yield _render_frame(i)
+        return
+
+    max_workers = max_workers or os.cpu_count() or 1
+    max_pending = max_pending or 2 * max_workers
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker, initargs=init_args) as executor:
+        pending = collections.deque()
+        for i in steps:
+            pending.append(executor.submit(_render_frame, i))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def render_animation(plot_fn: Callable[['matplotlib.figure.Figure', int], Any], num_iterations: int, save_path: str,
+                     iter_stepsize: int = 1, fps: int = 60, writer_kwargs: Dict[str, Any] = None, **kwargs: Any):
+    """
+    Render matplotlib frames in parallel with `render_frames` and stream them straight into a video with `VideoWriter`
+    (or into a GIF with `GifWriter` if save_path ends with .gif), without holding them all in memory.
+
+    Example usage:
+    ```
+    iter_stepsize, fps, num_frames = recommend_fps(len(data), 100, 5, 10)
+    render_animation(functools.partial(plot, data=data), len(data), 'video.mp4', iter_stepsize, fps)
+    ```
+
+    Parameters
+    ----------
+    plot_fn : callable
+        Function `plot_fn(fig, i)` drawing the frame of iteration i on the figure.
+    num_iterations : int
+        Number of potential frames, as passed to `recommend_fps`.
+    save_path : str
+        Path to save the video (or GIF).
+    iter_stepsize : int
+        Iteration stepsize returned by `recommend_fps`.
+    fps : int
+        Framerate returned by `recommend_fps`.
+    writer_kwargs : dict
+        Additional arguments to pass to the `VideoWriter` or `GifWriter` (e.g. scale, width, palette for a GIF).
+    kwargs : dict
+        Additional arguments to pass to `render_frames`.
+    """
+    writer_cls = GifWriter if str(save_path).lower().endswith('.gif') else VideoWriter
+    with writer_cls(save_path, fps=fps, **(writer_kwargs or {})) as writer:
+        writer.write_all(render_frames(plot_fn, num_iterations, iter_stepsize, **kwargs))
+
+
+def _init_render_worker(plot_fn, setup_fn, figsize, dpi):
+    """
+    Create the figure reused by this worker. The Agg canvas is attached directly, without going through pyplot, so no
+    GUI backend is involved and the figure is never tracked (or leaked) by pyplot.
+    """
+    import matplotlib.figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    global _worker_fig, _worker_plot_fn, _worker_clear
+    _worker_fig = matplotlib.figure.Figure(figsize=figsize, dpi=dpi)
+    FigureCanvasAgg(_worker_fig)
+    _worker_plot_fn = plot_fn
+    _worker_clear = setup_fn is None
+    if setup_fn is not None:
+        setup_fn(_worker_fig)
+
+
+def _render_frame(i: int) -> np.ndarray:
+    if _worker_clear:
+        _worker_fig.clear()
+    _worker_plot_fn(_worker_fig, i)
+    return extract_frame(_worker_fig)
+
+
+class GifWriter(VideoWriter):
+    """
+    Stream frames (RGB images) straight into a GIF, in a single pass through ffmpeg's palettegen/paletteuse filters,
+    without going through an mp4 first (see `convert_mp4_to_gif`). A palette generated for the frames looks much better
+    than ffmpeg's default one, and downscaling and skipping frames keep GIF previews of long runs small and fast.
+
+    By default (`palette='frame'`), a new palette is generated for every frame, so memory stays bounded however long
+    the GIF is. For the best quality on short clips, `palette='global'` generates one palette from all frames, but
+    ffmpeg has to buffer all the (downscaled) frames until the end to do so. To get one shared palette with bounded
+    memory, generate it once with `make_gif_palette` (e.g. from a subsample of the frames) and pass its path to reuse
+    it for every frame (and across GIFs, so they share their colors).
+
+    Example usage:
+    ```
+    with GifWriter('preview.gif', fps=30, scale=0.5, frame_skip=2) as writer:
+        for frame in frames:
+            writer.write(frame)
+    ```
+
+    Parameters
+    ----------
+    save_path : str
+        Path to save the GIF.
+    fps : int
+        Framerate of the frames. With frame_skip, the GIF's framerate is divided accordingly so its duration is kept.
+    scale : float
+        Factor to downscale the frames by.
+    width : int
+        Width in pixels to downscale the frames to, keeping the aspect ratio. Mutually exclusive with scale.
+    frame_skip : int
+        Only keep every frame_skip-th frame. Skipped frames are dropped before being sent to ffmpeg.
+    palette : str
+        'frame', 'global', or the path to a palette image to reuse, see above.
+    max_colors : int
+        Maximum number of colors of a generated palette (at most 256).
+    dither : str
+        Dithering mode of paletteuse, e.g. 'sierra2_4a' (default), 'bayer', 'floyd_steinberg' or 'none'.
+    kwargs : dict
+        Additional arguments to pass to `VideoWriter`.
+    """
+
+    def __init__(self, save_path: str, fps: int = 60, scale: float = None, width: int = None, frame_skip: int = 1,
+                 palette: str = 'frame', max_colors: int = 256, dither: str = 'sierra2_4a', **kwargs: Any):
+        assert frame_skip >= 1, "frame_skip should be at least 1."
+        assert scale is None or width is None, "Only one of scale and width can be given."
+        super().__init__(save_path, fps=fps / frame_skip, **kwargs)
+        self.scale = scale
+        self.width = width
+        self.frame_skip = frame_skip
+        self.palette = palette
+        self.max_colors = max_colors
+        self.dither = dither
+        self._frame_index = 0
+
+    def write(self, frame: np.ndarray):
+        self._frame_index += 1
+        if (self._frame_index - 1) % self.frame_skip == 0:
+            super().write(frame)
+
+    def _scale(self, stream):
+        if self.width is not None:
+            return stream.filter('scale', self.width, -1, flags='lanczos')
+        if self.scale is not None:
+            return stream.filter('scale', f'iw*{self.scale}', -1, flags='lanczos')
+        return stream
+
+    def _output(self, stream):
+        import ffmpeg
+
+        stream = self._scale(stream)
+        if self.palette in ('global', 'frame'):
+            per_frame = self.palette == 'frame'
+            split = stream.split()
+            palette = split[0].filter('palettegen', max_colors=self.max_colors,
+                                      stats_mode='single' if per_frame else 'full')
+            stream = ffmpeg.filter([split[1], palette], 'paletteuse', dither=self.dither, new=int(per_frame))
+        else:
+            stream = ffmpeg.filter([stream, ffmpeg.input(self.palette)], 'paletteuse', dither=self.dither)
+        # loop=0 means infinite repeat
+        return stream.output(self.save_path, loglevel='error', loop=0, **self.output_kwargs)
+
+
+class _PaletteWriter(GifWriter):
+    """
+    Writes the palette generated from the frames instead of the GIF.
+    """
+
+    def _output(self, stream):
+        return (
+            self._scale(stream)
+            .filter('palettegen', max_colors=self.max_colors)
+            .output(self.save_path, loglevel='error', update=1, **self.output_kwargs)
+        )
+
+
+def make_gif(frames: Iterable[np.ndarray], save_path: str, fps: int = 60, **kwargs: Any):
+    """
+    Make a GIF from frames (RGB images) with `GifWriter`. Frames can be any iterable, e.g. a generator like
+    `render_frames`, so they don't need to be held in memory.
+
+    Parameters
+    ----------
+    frames : Iterable[np.ndarray]
+        Frames to make the GIF from.
+    save_path : str
+        Path to save the GIF.
+    fps : int
+        Framerate of the frames.
+    kwargs : dict
+        Additional arguments to pass to `GifWriter` (scale, width, frame_skip, palette, max_colors, dither, ...).
+    """
+    with GifWriter(save_path, fps=fps, **kwargs) as writer:
+        writer.write_all(frames)
+
+
+def make_gif_palette(frames: Iterable[np.ndarray], palette_path: str, scale: float = None, width: int = None,
+                     frame_skip: int = 1, max_colors: int = 256):
+    """
+    Generate a GIF palette (a 16x16 PNG) from frames, to pass as `palette` to `GifWriter` / `make_gif`. Only color
+    statistics are accumulated, so memory is bounded however many frames there are. Use the same scale (or width) as
+    the GIF, and e.g. a frame_skip to only sample some of the frames.
+
+    Parameters
+    ----------
+    frames : Iterable[np.ndarray]
+        Frames to generate the palette from.
+    palette_path : str
+        Path to save the palette (.png).
+    scale : float
+        See `GifWriter`.
+    width : int
+        See `GifWriter`.
+    frame_skip : int
+        Only sample every frame_skip-th frame.
+    max_colors : int
+        Maximum number of colors of the palette (at most 256).
+    """
+    with _PaletteWriter(palette_path, scale=scale, width=width, frame_skip=frame_skip,
+                        max_colors=max_colors) as writer:
+        writer.write_all(frames)
+
+
 def convert_mp4_to_gif(mp4_path: str, gif_path: str = None):
     """
-    Convert an mp4 video to a gif.
+    Convert an mp4 video to a gif. A palette is generated from the video so the colors are preserved. To make a GIF
+    from frames directly, prefer `make_gif` / `GifWriter`.
 
     Parameters
     ----------
@@ -223,25 +882,45 @@ def convert_mp4_to_gif(mp4_path: str, gif_path: str = None):
     gif_path : str
         Path to save the gif.
     """
+    import ffmpeg
+
     if gif_path is None:
         gif_path = mp4_path.replace('.mp4', '.gif')
-    ffmpeg.input(mp4_path).output(gif_path, loglevel='quiet').run(overwrite_output=True)
+    split = ffmpeg.input(mp4_path).split()
+    palette = split[0].filter('palettegen')
+    (
+        ffmpeg.filter([split[1], palette], 'paletteuse')
+        .output(gif_path, loglevel='quiet')
+        .run(cmd=_ffmpeg_exe(), overwrite_output=True)
+    )
     logger.info(f'Converted {mp4_path} to {gif_path}.')
 
 
-def extract_frame(fig: matplotlib.figure.Figure) -> np.ndarray:
+def extract_frame(fig: 'matplotlib.figure.Figure', out: Union[np.ndarray, 'FrameRing'] = None, copy: bool = True,
+                  rgba: bool = False) -> np.ndarray:
     """
     Extract the current contents of a Matplotlib Figure as an RGB numpy array.
 
+    By default a new array is allocated for every frame. In tight rendering loops, pass a preallocated `out` buffer (or
+    a `FrameRing` of buffers) to avoid the allocation, or `copy=False` to get a view of the canvas buffer itself. The
+    view is only valid until the next draw of the figure, so it must be consumed (e.g. encoded or copied) before that.
+
     Parameters
     ----------
     fig : matplotlib.figure.Figure
         Figure to extract the frame from.
+    out : np.ndarray | FrameRing
+        Preallocated uint8 buffer of shape (H, W, 3) (or (H, W, 4) with rgba=True) to write the frame into, or a ring
+        of such buffers, in which case the next buffer of the ring is used.
+    copy : bool
+        Whether to copy the frame out of the canvas buffer. Ignored if out is given.
+    rgba : bool
+        Whether to keep the alpha channel.
 
     Returns
     -------
     np.ndarray
-        RGB image of shape (H, W, 3), dtype=uint8.
+        RGB image of shape (H, W, 3) (or RGBA of shape (H, W, 4) with rgba=True), dtype=uint8.
     """
     # Make sure the figure is rendered
     fig.canvas.draw()
@@ -250,11 +929,99 @@ def extract_frame(fig: matplotlib.figure.Figure) -> np.ndarray:
     width, height = fig.canvas.get_width_height()
 
     # Preferred modern API: RGBA buffer
-    rgba = np.asarray(fig.canvas.buffer_rgba())
-    rgba = rgba.reshape((height, width, 4))
+    frame = np.asarray(fig.canvas.buffer_rgba())
+    frame = frame.reshape((height, width, 4))
 
     # Drop alpha channel
-    rgb = rgba[..., :3]
+    if not rgba:
+        frame = frame[..., :3]
+
+    if out is not None:
+        if isinstance(out, FrameRing):
+            out = out.next()
+        if out.shape != frame.shape:
+            raise ValueError(f"out has shape {out.shape}, but the frame has shape {frame.shape}.")
+        np.copyto(out, frame)
+        return out
 
     # Return a copy so it is not tied to the canvas buffer
-    return rgb.copy()
+    return frame.copy() if copy else frame
+
+
+def extract_frames(fig: 'matplotlib.figure.Figure', plot_fn: Callable[['matplotlib.figure.Figure', int], Any],
+                   steps: Iterable[int], out: np.ndarray = None) -> np.ndarray:
+    """
+    Batched `extract_frame`: draw each step with `plot_fn(fig, i)` and write its frame into one (T, H, W, 3) array.
+
+    Parameters
+    ----------
+    fig : matplotlib.figure.Figure
+        Figure to draw on. It isn't cleared between steps, so `plot_fn` should update its artists (or clear it).
+    plot_fn : callable
+        Function `plot_fn(fig, i)` drawing the frame of step i on the figure.
+    steps : Iterable[int]
+        Steps to draw, e.g. the `recommend_fps` schedule.
+    out : np.ndarray
+        Preallocated uint8 array of shape (T, H, W, 3) with T >= the number of steps. If None, it is allocated once the
+        size of the frames is known.
+
+    Returns
+    -------
+    np.ndarray
+        The frames, of shape (T, H, W, 3), dtype=uint8.
+    """
+    steps = list(steps)
+    for t, i in enumerate(steps):
+        plot_fn(fig, i)
+        if out is None:
+            first = extract_frame(fig, copy=False)
+            out = np.empty((len(steps),) + first.shape, dtype=np.uint8)
+            out[0] = first
+        else:
+            extract_frame(fig, out=out[t])
+    return out
+
+
+class FrameRing:
+    """
+    Ring of preallocated frame buffers for `extract_frame(fig, out=ring)`. Each extraction writes into the next buffer,
+    so a frame stays valid until `size` more frames have been extracted. This allows e.g. handing frames to a
+    `VideoWriter` without copying them, as long as `size >= queue_size + 2` (the frames waiting in the queue, the one
+    being written and the one being filled). `VideoWriter` copies the frames of smaller rings.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of a frame, (H, W, 3) or (H, W, 4).
+    size : int
+        Number of buffers.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], size: int = 2):
+        self.buffers = np.empty((size,) + tuple(shape), dtype=np.uint8)
+        self.index = -1
+        _frame_rings[id(self.buffers)] = self
+
+    def next(self) -> np.ndarray:
+        self.index = (self.index + 1) % len(self.buffers)
+        return self.buffers[self.index]
+
+    def __len__(self):
+        return len(self.buffers)
+
+
+# id of the buffers of each live FrameRing -> FrameRing, to recognize their frames
+_frame_rings = weakref.WeakValueDictionary()
+
+
+def _find_frame_ring(frame: np.ndarray) -> FrameRing | None:
+    """
+    The FrameRing whose buffers frame is a view of, if any.
+    """
+    base = frame.base
+    while isinstance(base, np.ndarray):
+        ring = _frame_rings.get(id(base))
+        if ring is not None and ring.buffers is base:
+            return ring
+        base = base.base
+    return None
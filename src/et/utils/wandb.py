@@ -1,10 +1,14 @@
 import time
+from typing import TYPE_CHECKING
 
 from loguru import logger
-from wandb.sdk.wandb_run import Run
 
+# Only needed for annotations, importing wandb takes seconds
+if TYPE_CHECKING:
+    from wandb.sdk.wandb_run import Run
 
-def setup_wandb_run(run: Run, postfix: str = None) -> str:
+
+def setup_wandb_run(run: 'Run', postfix: str = None) -> str:
     """
     Set up the name of the run in wandb.
     The name will be in the format "mm.dd-hh:mm - run_id - postfix"